@@ -0,0 +1,144 @@
+"""
+Feeds a corpus of command strings through CommandManager.process_command(), trying the regex of every handler of a
+command in turn (the previous implementation) and trying only the handlers indexed by the first word of the args.
+
+The handlers are taken from the @command decorators of the core modules, with their callbacks replaced so that only
+routing and argument matching is measured.
+
+Run from the project root:
+
+    python -m benchmarks.command_benchmark
+"""
+from core.command_manager import CommandManager
+from core.command_alias_manager import CommandAliasManager
+from core.registry import Registry
+from tools.util import Util
+from __init__ import get_attrs
+import os
+import timeit
+
+CORPUS = [
+    "config",
+    "config mod core.system",
+    "config cmd whois",
+    "config cmd whois enable all",
+    "config cmd whois disable msg",
+    "config cmd whois access_level msg admin",
+    "config event timer:60 modules.core.tower.tower_controller.check disable",
+    "config setting symbol",
+    "config setting symbol #",
+    "config unknown args",
+    "alts",
+    "alts add Alt",
+    "alts rem Alt",
+    "alts Main",
+    "alias list",
+    "alias add w whois",
+    "admin",
+    "admin add Someone",
+    "member list",
+    "history Someone 2",
+    "whois Someone",
+    "help",
+    "help whois",
+    "countdown",
+    "countdown raid starts",
+    "checkaccess",
+    "queue",
+    "unknowncommand with args",
+]
+
+
+class Stub:
+    def check_access(self, char_id, access_level):
+        return True
+
+    def get_access_level_by_label(self, label):
+        return True
+
+    def resolve_char_to_name(self, char_id):
+        return "Tester"
+
+    def find(self, table, query):
+        return None
+
+    def insert(self, table, row):
+        pass
+
+    def find_all(self, table, query):
+        return self.rows
+
+
+class LegacyCommandManager(CommandManager):
+    def get_matches(self, route, command_args):
+        if command_args:
+            command_args = " " + command_args
+
+        for row in route['cmd_configs']:
+            for handler in row['handlers']:
+                matches = handler["regex"].match(command_args)
+                if matches:
+                    return row, matches.groups(), handler
+        return None, None, None
+
+
+def create_command_manager(cls, commands):
+    stub = Stub()
+    command_manager = cls()
+    command_manager.db = stub
+    command_manager.access_manager = stub
+    command_manager.character_manager = stub
+    command_manager.command_alias_manager = CommandAliasManager()
+    command_manager.register_command_channel("Private Message", CommandManager.PRIVATE_MESSAGE)
+
+    stub.rows = []
+    for cmd_name, params, access_level, description, help_file, sub_command in commands:
+        command_manager.register(lambda *args: None, cmd_name, params, access_level, description, "benchmark",
+                                 None, sub_command)
+        stub.rows.append({"command": cmd_name, "sub_command": sub_command or "", "channel": "msg",
+                          "access_level": access_level})
+    return command_manager
+
+
+def main(number=2000):
+    Registry.load_instances(["core", os.path.join("modules", "core")])
+    commands = []
+    for _, inst in Registry.get_all_instances().items():
+        for name, method in get_attrs(inst).items():
+            if hasattr(method, "command"):
+                commands.append(getattr(method, "command"))
+
+    def reply(msg):
+        pass
+
+    results = []
+    for cls in [LegacyCommandManager, CommandManager]:
+        command_manager = create_command_manager(cls, commands)
+        command_manager.util = Util()
+
+        def process_commands():
+            for command_str in CORPUS:
+                command_manager.process_command(command_str, CommandManager.PRIVATE_MESSAGE, 1, reply)
+
+        routes = []
+        for command_str in CORPUS:
+            command_str, command_args = command_manager.get_command_parts(command_str)
+            route = command_manager.get_route(command_str, CommandManager.PRIVATE_MESSAGE)
+            if route:
+                routes.append((route, command_args))
+
+        def get_matches():
+            for route, command_args in routes:
+                command_manager.get_matches(route, command_args)
+
+        results.append((min(timeit.repeat(process_commands, number=number, repeat=5)) / number / len(CORPUS) * 1e6,
+                        min(timeit.repeat(get_matches, number=number, repeat=5)) / number / len(routes) * 1e6))
+
+    print("%d commands, %d handlers" % (len(CORPUS), len(commands)))
+    print("%-10s %22s %22s" % ("", "process_command (us)", "get_matches (us)"))
+    print("%-10s %22.2f %22.2f" % (("legacy",) + results[0]))
+    print("%-10s %22.2f %22.2f" % (("prefix",) + results[1]))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""
+Schedules, cancels and runs jobs with the previous list-based scheduler and the heap-based JobScheduler.
+
+The list-based scheduler is quadratic, so it is only run with a fraction of the jobs by default.
+
+Run from the project root:
+
+    python -m benchmarks.job_scheduler_benchmark [count]
+"""
+from core.job_scheduler import JobScheduler
+import random
+import sys
+import time
+
+
+class LegacyJobScheduler:
+    def __init__(self):
+        self.jobs = []
+        self.job_id_index = 0
+
+    def check_for_scheduled_jobs(self, timestamp):
+        while self.jobs and self.jobs[0]["time"] <= timestamp:
+            job = self.jobs.pop(0)
+            job["callback"](job["time"], *job["args"], **job["kwargs"])
+
+    def scheduled_job(self, callback, scheduled_time, *args, **kwargs):
+        self.job_id_index += 1
+        new_job = {
+            "id": self.job_id_index,
+            "callback": callback,
+            "args": args,
+            "kwargs": kwargs,
+            "time": scheduled_time
+        }
+
+        for index, job in enumerate(self.jobs):
+            if job["time"] > new_job["time"]:
+                self.jobs.insert(index, new_job)
+                return self.job_id_index
+        self.jobs.append(new_job)
+        return self.job_id_index
+
+    def cancel_job(self, job_id):
+        for index, job in enumerate(self.jobs):
+            if job["id"] == job_id:
+                return self.jobs.pop(index)
+        return None
+
+
+def callback(timestamp):
+    pass
+
+
+def run(scheduler, times):
+    start = time.perf_counter()
+    job_ids = [scheduler.scheduled_job(callback, t) for t in times]
+    scheduled = time.perf_counter()
+
+    # cancel every other job, then run the rest
+    for job_id in job_ids[::2]:
+        scheduler.cancel_job(job_id)
+    cancelled = time.perf_counter()
+
+    scheduler.check_for_scheduled_jobs(max(times))
+    finished = time.perf_counter()
+
+    return scheduled - start, cancelled - scheduled, finished - cancelled
+
+
+def main(count=100000):
+    rng = random.Random(0)
+    times = [1000 + rng.random() * 3600 for _ in range(count)]
+    legacy_count = count // 10
+
+    print("%-12s %8s %12s %12s %12s" % ("scheduler", "jobs", "schedule (s)", "cancel (s)", "run (s)"))
+    print("%-12s %8d %12.3f %12.3f %12.3f" % (("legacy", legacy_count) + run(LegacyJobScheduler(), times[:legacy_count])))
+    print("%-12s %8d %12.3f %12.3f %12.3f" % (("heap", legacy_count) + run(JobScheduler(), times[:legacy_count])))
+    print("%-12s %8d %12.3f %12.3f %12.3f" % (("heap", count) + run(JobScheduler(), times)))
+
+
+if __name__ == "__main__":
+    main(*map(int, sys.argv[1:]))
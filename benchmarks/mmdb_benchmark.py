@@ -0,0 +1,179 @@
+"""
+Looks up message strings in text.mdb with the previous MMDBParser, which opened the file and scanned the category and
+entry tables for every lookup, and with the memory-mapped index of MMDBParser.
+
+Then formats an extended message with the previous parse_params(), which sliced the param string for every param,
+with MMDBParser.decode_params() and with the cached MMDBParser.format_message().
+
+Run from the project root:
+
+    python -m benchmarks.mmdb_benchmark
+"""
+from core.aochat.mmdb_parser import MMDBParser
+import struct
+import timeit
+
+FILENAME = "text.mdb"
+
+
+class LegacyMMDBParser:
+    def __init__(self, filename):
+        self.filename = filename
+
+    def get_message_string(self, category_id, instance_id):
+        with open(self.filename, "rb") as file:
+            categories = self.get_categories(file)
+
+            try:
+                category = next(categories)
+                while category["id"] != category_id:
+                    category = next(categories)
+                next_category = next(categories)
+            except StopIteration:
+                return None
+
+            instance = self.find_entry(file, instance_id, category["offset"], next_category["offset"])
+
+            if instance:
+                file.seek(instance["offset"])
+                return self.read_string(file)
+            else:
+                return None
+
+    def find_entry(self, file, entry_id, min_offset, max_offset):
+        file.seek(min_offset)
+        entry = self.read_entry(file)
+        while file.tell() <= max_offset:
+            if entry["id"] == entry_id:
+                return entry
+            entry = self.read_entry(file)
+
+        return None
+
+    def get_categories(self, file):
+        file.seek(4)
+        num_categories = self.read_int(file)
+        for i in range(0, num_categories):
+            yield self.read_entry(file)
+
+    def read_entry(self, file):
+        return {"id": self.read_int(file), "offset": self.read_int(file)}
+
+    def read_int(self, file):
+        return int.from_bytes(file.read(4), byteorder="little")
+
+    def read_string(self, file):
+        message = bytearray()
+        char = file.read(1)
+        while char and char != b'\x00':
+            message.append(ord(char))
+            char = file.read(1)
+
+        return message.decode("ISO-8859-1")
+
+    def read_base_85(self, num_str):
+        n = 0
+        for i in range(0, 5):
+            n = n * 85 + ord(num_str[i]) - 33
+        return n
+
+    def parse_params(self, param_str):
+        args = []
+        while param_str:
+            data_type = param_str[0]
+            param_str = param_str[1:]
+            if data_type == "S":
+                size = ord(param_str[0]) * 256 + ord(param_str[1])
+                args.append(param_str[2:2 + size])
+                param_str = param_str[2 + size:]
+            elif data_type == "s":
+                size = ord(param_str[0]) - 1  # size is 1 less than indicated
+                args.append(param_str[1:1 + size])
+                param_str = param_str[1 + size:]
+            elif data_type == "I":
+                args.append(struct.unpack(">I", param_str[:4].encode("latin-1"))[0])
+                param_str = param_str[4:]
+            elif data_type == "i" or data_type == "u":
+                args.append(self.read_base_85(param_str[:5]))
+                param_str = param_str[5:]
+            elif data_type == "R":
+                category_id = self.read_base_85(param_str[:5])
+                instance_id = self.read_base_85(param_str[5:10])
+                message = self.get_message_string(category_id, instance_id)
+                if not message:
+                    raise Exception("Could not find message string for category '%s' and instance '%s'" % (category_id, instance_id))
+                args.append(message)
+                param_str = param_str[10:]
+            elif data_type == "l":
+                category_id = 20000
+                instance_id = struct.unpack(">I", param_str[:4].encode("latin-1"))[0]
+                message = self.get_message_string(category_id, instance_id)
+                if not message:
+                    raise Exception("Could not find message string for category '%s' and instance '%s'" % (category_id, instance_id))
+                args.append(message)
+                param_str = param_str[5:]
+            else:
+                raise Exception("Unknown argument type '%s'" % data_type)
+
+        return args
+
+
+def encode_base_85(n):
+    digits = ""
+    for _ in range(0, 5):
+        digits = chr(n % 85 + 33) + digits
+        n //= 85
+    return digits
+
+
+def main(number=20):
+    legacy = LegacyMMDBParser(FILENAME)
+    mmdb = MMDBParser(FILENAME)
+    mmdb.load()
+
+    keys = list(mmdb.offsets)
+    for category_id, instance_id in keys:
+        assert legacy.get_message_string(category_id, instance_id) == mmdb.get_message_string(category_id, instance_id)
+    assert legacy.get_message_string(20000, 0) is None and mmdb.get_message_string(20000, 0) is None
+
+    # system messages are in the last category of the file, the worst case for a scan
+    samples = [key for key in keys if key[0] == 20000][:100]
+
+    def lookup(parser):
+        for category_id, instance_id in samples:
+            parser.get_message_string(category_id, instance_id)
+
+    legacy_time = min(timeit.repeat(lambda: lookup(legacy), number=number, repeat=5)) / number / len(samples) * 1e6
+    new_time = min(timeit.repeat(lambda: lookup(mmdb), number=number, repeat=5)) / number / len(samples) * 1e6
+
+    print("%d message strings, %d lookups" % (len(keys), len(samples)))
+    print("%-10s %14s" % ("", "lookup (us)"))
+    print("%-10s %14.2f" % ("legacy", legacy_time))
+    print("%-10s %14.2f" % ("indexed", new_time))
+    print("speedup    %13.1fx" % (legacy_time / new_time))
+
+    # '%s was attacked with %s for %u points of %s damage.'
+    category_id, instance_id = 100, 429
+    param_str = "s" + chr(9) + "Attacker" + "s" + chr(7) + "Pistol" + "u" + encode_base_85(1234) + \
+        "R" + encode_base_85(506) + encode_base_85(21684)
+
+    def legacy_format():
+        return legacy.get_message_string(category_id, instance_id) % tuple(legacy.parse_params(param_str))
+
+    def decode_format():
+        return mmdb.get_message_string(category_id, instance_id) % mmdb.decode_params(param_str)
+
+    def cached_format():
+        return mmdb.format_message(category_id, instance_id, param_str)
+
+    assert legacy_format() == decode_format() == cached_format()
+
+    print()
+    print("%-10s %14s" % ("", "format (us)"))
+    number *= 100
+    for name, func in [("legacy", legacy_format), ("decoded", decode_format), ("cached", cached_format)]:
+        print("%-10s %14.2f" % (name, min(timeit.repeat(func, number=number, repeat=5)) / number * 1e6))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""
+Compares the previous decode_args implementation with the compiled PacketCodec for every server packet type.
+
+Run from the project root:
+
+    python -m benchmarks.packets_benchmark
+"""
+from core.aochat.packets import encode_args, UnknownArgumentType
+from core.aochat.server_packets import ServerPacket
+import struct
+import timeit
+
+SAMPLE_VALUES = {
+    "I": 123456789,
+    "S": "<font color='#FFFFFF'>Some text that is sent to the bot</font>" * 20,
+    "G": (3 << 32) + 12345,
+    "i": tuple(range(100000, 100008)),
+    "s": ["Char%d" % i for i in range(8)]
+}
+
+
+def legacy_decode_args(types, data):
+    args = []
+    for argtype in types:
+        if argtype == "I":
+            elem, data = data[:4], data[4:]
+            result = struct.unpack(">I", elem)[0]
+
+        elif argtype == "S":
+            length = struct.unpack(">H", data[:2])[0]
+            result = data[2:2 + length].decode('iso-8859-1')
+            data = data[2 + length:]
+
+        elif argtype == "G":
+            result, data = data[:5], data[5:]
+            high, low = struct.unpack(">BI", result)
+            result = (high << 32) + low
+
+        elif argtype == "i":
+            length = struct.unpack(">H", data[:2])[0]
+            result = struct.unpack(">%sI" % length, data[2:2 + 4 * length])
+            data = data[2 + 4 * length:]
+
+        elif argtype == "s":
+            length = struct.unpack(">H", data[:2])[0]
+            data = data[2:]
+            result = []
+            while length:
+                slength = struct.unpack(">H", data[:2])[0]
+                result.append(data[2:2 + slength].decode('iso-8859-1'))
+                data = data[2 + slength:]
+                length -= 1
+
+        else:
+            raise UnknownArgumentType(argtype)
+
+        args.append(result)
+
+    return args
+
+
+def main(number=20000):
+    print("%-28s %6s %12s %12s %8s" % ("packet", "types", "legacy (us)", "codec (us)", "speedup"))
+    for packet_id, packet_class in sorted(ServerPacket.packet_types.items()):
+        types = packet_class.types
+        data = bytes(encode_args(types, [SAMPLE_VALUES[t] for t in types]))
+        assert legacy_decode_args(types, data) == packet_class.codec.decode(data)
+
+        legacy = min(timeit.repeat(lambda: legacy_decode_args(types, data), number=number, repeat=5)) / number * 1e6
+        codec = min(timeit.repeat(lambda: packet_class.codec.decode(data), number=number, repeat=5)) / number * 1e6
+        print("%-28s %6s %12.2f %12.2f %7.1fx" % (packet_class.__name__, types, legacy, codec, legacy / codec))
+
+
+if __name__ == "__main__":
+    main()
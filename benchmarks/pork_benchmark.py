@@ -0,0 +1,84 @@
+"""
+Loads character info for a roster of characters from a local stub of people.anarchy-online.com that answers every
+request after LATENCY seconds, one character at a time with load_character_info() as AltsManager used to, and in one
+batch with load_character_infos().
+
+Run from the project root:
+
+    python -m benchmarks.pork_benchmark
+"""
+from core.pork.pork_manager import PorkManager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest.mock import Mock
+import json
+import threading
+import time
+
+LATENCY = 0.05
+ROSTER_SIZE = 100
+
+
+class PorkStubHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        time.sleep(LATENCY)
+        name = self.path.split("/name/")[1].split("/")[0]
+        body = json.dumps([{
+            "NAME": name, "CHAR_INSTANCE": int(name[4:]), "FIRSTNAME": "", "LASTNAME": "", "LEVELX": 220,
+            "BREED": "Solitus", "CHAR_DIMENSION": 5, "SEX": "Female", "SIDE": "Omni", "PROF": "Doctor",
+            "PROFNAME": "Surgeon", "RANK_name": "Champion", "ALIENLEVEL": 30, "PVPRATING": 1300, "PVPTITLE": None,
+            "HEADID": 40
+        }, None]).encode()
+
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def create_pork_manager(port):
+    pork_manager = PorkManager()
+    pork_manager.base_url = "http://127.0.0.1:%d" % port
+    pork_manager.bot = Mock()
+    pork_manager.bot.dimension = 5
+    pork_manager.db = Mock()
+    pork_manager.db.find.return_value = None
+    pork_manager.db.find_all.return_value = []
+    pork_manager.character_manager = Mock()
+    pork_manager.character_manager.resolve_char_to_name.side_effect = lambda char: "Char%d" % char
+    return pork_manager
+
+
+def main():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), PorkStubHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    char_ids = list(range(1000, 1000 + ROSTER_SIZE))
+
+    pork_manager = create_pork_manager(server.server_port)
+    start = time.time()
+    for char_id in char_ids:
+        pork_manager.load_character_info(char_id)
+    one_by_one = time.time() - start
+    one_by_one_writes = pork_manager.db.bulk_upsert.call_count
+    pork_manager.stop()
+
+    pork_manager = create_pork_manager(server.server_port)
+    start = time.time()
+    pork_manager.load_character_infos(char_ids)
+    batch = time.time() - start
+    batch_writes = pork_manager.db.bulk_upsert.call_count
+    assert len(pork_manager.db.bulk_upsert.call_args[0][2]) == ROSTER_SIZE
+    pork_manager.stop()
+
+    server.shutdown()
+
+    print("%d characters, %d ms latency, %d workers" % (ROSTER_SIZE, LATENCY * 1000, PorkManager.MAX_WORKERS))
+    print("%-12s %10s %10s" % ("", "time (s)", "writes"))
+    print("%-12s %10.2f %10d" % ("one by one", one_by_one, one_by_one_writes))
+    print("%-12s %10.2f %10d" % ("batch", batch, batch_writes))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,159 @@
+"""
+Formats large ChatBlob payloads with the previous chain of str.replace() calls and with the single-pass
+Text.format_message(), then paginates blobs of up to 100 KB with the previous paginator, which split the rest of the
+message again for every line, and with Text.paginate().
+
+Run from the project root:
+
+    python -m benchmarks.text_benchmark
+"""
+from core.setting_manager import SettingManager
+from tools.chat_blob import ChatBlob
+from tools.setting_types import ColorSettingType, TextSettingType
+from tools.text import Text
+import timeit
+
+SETTINGS = {
+    "header_color": "#FFFF00",
+    "header2_color": "#FCA712",
+    "highlight_color": "#FFFFFF",
+    "notice_color": "#FF8C00",
+    "neutral_color": "#E6E1A6",
+    "omni_color": "#FA8484",
+    "clan_color": "#F79410",
+    "unknown_color": "#FF0000"
+}
+
+LINE = "<tab><highlight>Somechar<end> (<green>220/30<end> <omni>Omni<end> Nano-Technician) " \
+       "<a href='chatcmd:///tell <myname> whois Somechar'>Info</a>\n"
+
+
+class Bot:
+    char_name = "Mybot"
+    org_name = "Some Org"
+
+
+def legacy_format_message(setting_manager, bot, msg):
+    return msg \
+        .replace("<header>", setting_manager.get("header_color").get_font_color()) \
+        .replace("<header2>", setting_manager.get("header2_color").get_font_color()) \
+        .replace("<highlight>", setting_manager.get("highlight_color").get_font_color()) \
+        .replace("<notice>", setting_manager.get("notice_color").get_font_color()) \
+        \
+        .replace("<black>", "<font color='#000000'>") \
+        .replace("<white>", "<font color='#FFFFFF'>") \
+        .replace("<yellow>", "<font color='#FFFF00'>") \
+        .replace("<blue>", "<font color='#8CB5FF'>") \
+        .replace("<green>", "<font color='#00DE42'>") \
+        .replace("<red>", "<font color='#FF0000'>") \
+        .replace("<orange>", "<font color='#FCA712'>") \
+        .replace("<grey>", "<font color='#C3C3C3'>") \
+        .replace("<cyan>", "<font color='#00FFFF'>") \
+        .replace("<violet>", "<font color='#8F00FF'>") \
+        \
+        .replace("<neutral>", setting_manager.get("neutral_color").get_font_color()) \
+        .replace("<omni>", setting_manager.get("omni_color").get_font_color()) \
+        .replace("<clan>", setting_manager.get("clan_color").get_font_color()) \
+        .replace("<unknown>", setting_manager.get("unknown_color").get_font_color()) \
+        \
+        .replace("<myname>", bot.char_name) \
+        .replace("<myorg>", bot.org_name if bot.org_name else "Unknown Org") \
+        .replace("<tab>", "    ") \
+        .replace("<end>", "</font>") \
+        .replace("<symbol>", setting_manager.get("symbol").get_value()) \
+        .replace("<br>", "\n")
+
+
+def legacy_paginate(text, label, msg, max_page_length, max_num_pages=None, footer=None):
+    separators = iter(text.separators)
+
+    msg = ("<header>" + label + "<end>\n\n" + msg.strip()).replace("\"", "\\\"")
+    msg = text.format_message(msg)
+
+    if footer:
+        footer = "\n\n" + text.format_message(footer.replace("\"", "\\\""))
+    else:
+        footer = ""
+
+    rest = msg
+    current_page = ""
+    pages = []
+    separator = next(separators)
+    while len(rest) > 0:
+        line, rest = text.get_next_line(rest, separator)
+        line_length = len(line)
+
+        if line_length > max_page_length:
+            try:
+                separator = next(separators)
+                rest = line + rest
+                continue
+            except StopIteration:
+                raise Exception("Could not paginate: page is too large")
+
+        if max_num_pages == len(pages) + 1:
+            if len(current_page) + line_length + len(footer) > max_page_length:
+                break
+        else:
+            if len(current_page) + line_length > max_page_length:
+                pages.append(current_page.strip())
+                current_page = ""
+
+        current_page += line
+
+    current_page = current_page.strip()
+    if len(current_page) + len(footer) > max_page_length:
+        pages.append(current_page)
+        pages.append(footer.strip())
+    else:
+        pages.append(current_page + footer)
+
+    num_pages = len(pages)
+    return [text.format_page(label if num_pages == 1 else label + " (Page " + str(index) + " / " + str(num_pages) + ")",
+                             page) for page, index in zip(pages, range(1, num_pages + 1))]
+
+
+def create_text():
+    setting_manager = SettingManager()
+    for name, value in list(SETTINGS.items()) + [("symbol", "!")]:
+        setting = TextSettingType() if name == "symbol" else ColorSettingType()
+        setting.setting_manager = setting_manager
+        setting.set_name(name)
+        setting_manager.settings[name] = setting
+        setting_manager.values[name] = value
+
+    text = Text()
+    text.setting_manager = setting_manager
+    text.bot = Bot()
+    return text
+
+
+def main(number=200):
+    text = create_text()
+
+    print("%-10s %12s %12s %8s" % ("blob size", "legacy (us)", "new (us)", "speedup"))
+    for num_lines in [1, 10, 100, 1000]:
+        blob = ChatBlob("Online (%d)" % num_lines, "<header2>Members<end>\n" + LINE * num_lines)
+        msg = "<header>" + blob.title + "<end>\n\n" + blob.msg
+        assert legacy_format_message(text.setting_manager, text.bot, msg) == text.format_message(msg)
+
+        legacy = min(timeit.repeat(lambda: legacy_format_message(text.setting_manager, text.bot, msg),
+                                   number=number, repeat=5)) / number * 1e6
+        new = min(timeit.repeat(lambda: text.format_message(msg), number=number, repeat=5)) / number * 1e6
+        print("%-10d %12.1f %12.1f %7.1fx" % (len(msg), legacy, new, legacy / new))
+
+    print()
+    print("%-10s %12s %12s %8s" % ("paginate", "legacy (ms)", "new (ms)", "speedup"))
+    for size in [1000, 10000, 100000]:
+        msg = "<header2>Members<end>\n" + LINE * (size // len(LINE))
+        assert legacy_paginate(text, "Online", msg, 7500) == text.paginate("Online", msg, 7500)
+
+        number = max(1, 100000 // size)
+        legacy = min(timeit.repeat(lambda: legacy_paginate(text, "Online", msg, 7500),
+                                   number=number, repeat=5)) / number * 1e3
+        new = min(timeit.repeat(lambda: text.paginate("Online", msg, 7500), number=number, repeat=5)) / number * 1e3
+        print("%-10d %12.2f %12.2f %7.1fx" % (len(msg), legacy, new, legacy / new))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+"""
+Replays a packet stream through the old and the new socket receive paths.
+
+Run from the project root:
+
+    python -m benchmarks.transport_benchmark [capture_file]
+
+`capture_file` is an optional raw dump of the bytes received from the chat server. When omitted, a synthetic stream
+of buddy status updates and private channel messages with large blobs is generated.
+"""
+from core.aochat.packets import encode_args
+from core.aochat.transport import SocketTransport
+from core.aochat import server_packets
+import socket
+import struct
+import select
+import threading
+import time
+import sys
+
+
+class LegacySocketTransport(SocketTransport):
+    """
+    The receive path as it was before FrameBuffer, kept for comparison.
+    """
+
+    def read_frame(self, timeout):
+        read, write, error = select.select([self.socket], [], [], timeout)
+        if not read:
+            return None
+        else:
+            head = self.read_bytes(4)
+            packet_type, packet_length = struct.unpack(">2H", head)
+            data = self.read_bytes(packet_length)
+            return packet_type, data
+
+    def read_bytes(self, num_bytes):
+        data = bytes()
+
+        while num_bytes > 0:
+            chunk = self.socket.recv(num_bytes)
+
+            if len(chunk) == 0:
+                raise EOFError
+
+            num_bytes -= len(chunk)
+            data = data + chunk
+
+        return data
+
+
+def frame(packet_class, args):
+    data = encode_args(packet_class.types, list(args))
+    return struct.pack(">2H", packet_class.id, len(data)) + data
+
+
+def generate_stream(num_packets=20000):
+    blob = "<a href=\"text://" + ("<font color='#FFFFFF'>line of blob text</font>\n" * 250) + "\">Blob</a>"
+    frames = []
+    for i in range(num_packets):
+        if i % 10 == 0:
+            frames.append(frame(server_packets.PrivateChannelMessage, [123456, 100000 + i, blob, "\0"]))
+        elif i % 3 == 0:
+            frames.append(frame(server_packets.PublicChannelMessage, [(3 << 32) + 1234, 100000 + i, "hello org", ""]))
+        else:
+            frames.append(frame(server_packets.BuddyAdded, [100000 + i, i % 2, "\1"]))
+    return b"".join(frames)
+
+
+def count_frames(stream):
+    count = 0
+    offset = 0
+    while offset < len(stream):
+        packet_type, packet_length = struct.unpack_from(">2H", stream, offset)
+        offset += 4 + packet_length
+        count += 1
+    return count
+
+
+def replay(transport_class, stream, num_frames, segment_size=1460):
+    reader, writer = socket.socketpair()
+
+    def send():
+        view = memoryview(stream)
+        for i in range(0, len(stream), segment_size):
+            writer.sendall(view[i:i + segment_size])
+        writer.close()
+
+    transport = transport_class()
+    transport.socket = reader
+    thread = threading.Thread(target=send)
+
+    start = time.perf_counter()
+    thread.start()
+    num_bytes = 0
+    for i in range(num_frames):
+        packet_type, data = transport.read_frame(10)
+        num_bytes += len(data)
+    elapsed = time.perf_counter() - start
+
+    thread.join()
+    reader.close()
+    return elapsed, num_bytes
+
+
+def main():
+    if len(sys.argv) > 1:
+        with open(sys.argv[1], "rb") as f:
+            stream = f.read()
+    else:
+        stream = generate_stream()
+
+    num_frames = count_frames(stream)
+    print("replaying %d frames (%d bytes)" % (num_frames, len(stream)))
+    for transport_class in [LegacySocketTransport, SocketTransport]:
+        elapsed, num_bytes = replay(transport_class, stream, num_frames)
+        print("%-24s %8.3f s %10.1f frames/s" % (transport_class.__name__, elapsed, num_frames / elapsed))
+
+
+if __name__ == "__main__":
+    main()
@@ -2,6 +2,7 @@ import json
 import time
 import os
 from core.aochat.mmdb_parser import MMDBParser
+from core.aochat.asyncio_transport import AsyncioTransport
 from pymongo.errors import ConnectionFailure
 from core.registry import Registry
 from tools.config_creator import create_new_cfg
@@ -46,6 +47,9 @@ try:
     db.connect(config["db_host"], config["db_name"])
 
     bot.init(config, Registry)
+    if config.get("transport") == "asyncio":
+        bot.set_transport(AsyncioTransport())
+
     if int(config["dimension"]) == 1:
         bot.connect("chat.d1.funcom.com", 7105)
     elif int(config["dimension"]) == 2:
@@ -64,6 +68,7 @@ try:
         exit(3)
     else:
         status = bot.run()
+        Registry.stop_all()
         bot.disconnect()
         exit(status.value)
 
@@ -1,14 +1,21 @@
 from core.decorators import instance
 from tools.logger import Logger
+from tools.cache import LRUCache
 
 
 @instance()
 class AccessManager:
+    CACHE_SIZE = 1000
+    CACHE_TTL = 300
+
     def __init__(self):
         self.access_levels = [
             {"label": "none", "level": 0, "handler": self.no_access},
             {"label": "all", "level": 100, "handler": self.all_access}]
         self.logger = Logger("access_manager")
+        # access level by char id. The entry of a char depends on its main as well, so any change to admins,
+        # members, or alts must call clear_cache()
+        self.cache = LRUCache(self.CACHE_SIZE, self.CACHE_TTL)
 
     def inject(self, registry):
         self.character_manager = registry.get_instance("character_manager")
@@ -18,6 +25,7 @@ class AccessManager:
         self.logger.debug("Registering access level %d with label '%s'" % (level, label))
         self.access_levels.append({"label": label.lower(), "level": level, "handler": handler})
         self.access_levels = sorted(self.access_levels, key=lambda k: k["level"])
+        self.clear_cache()
 
     def get_access_levels(self):
         return self.access_levels
@@ -27,6 +35,13 @@ class AccessManager:
         if not char_id:
             return None
 
+        access_level = self.cache.get(char_id)
+        if access_level is None:
+            access_level = self.get_uncached_access_level(char_id)
+            self.cache.set(char_id, access_level)
+        return access_level
+
+    def get_uncached_access_level(self, char_id):
         access_level1 = self.get_single_access_level(char_id)
         alts = list(self.alts_manager.get_alts(char_id))
         if not alts:
@@ -61,6 +76,9 @@ class AccessManager:
                 return access_level
         return None
 
+    def clear_cache(self):
+        self.cache.clear()
+
     def check_access(self, char, access_level_label):
         return self.get_access_level(char)["level"] <= self.get_access_level_by_label(access_level_label)["level"]
 
@@ -40,12 +40,15 @@ class AdminManager:
             # remove any existing admin access level first
             self.remove(char_id)
             self.db.insert('admin', {'char_id': char_id, 'access_level': access_level})
+            self.access_manager.clear_cache()
             return True
         else:
             return False
 
     def remove(self, char_id):
-        return self.db.delete_all('admin', {'char_id': char_id})
+        result = self.db.delete_all('admin', {'char_id': char_id})
+        self.access_manager.clear_cache()
+        return result
 
     def get_all(self):
         return self.db.client['admin'].aggregate([
@@ -14,6 +14,7 @@ class AltsManager:
         self.db = registry.get_instance("db")
         self.character_manager = registry.get_instance("character_manager")
         self.pork_manager = registry.get_instance("pork_manager")
+        self.access_manager = registry.get_instance("access_manager")
 
     def start(self):
         pass
@@ -41,6 +42,9 @@ class AltsManager:
         if alt_row:
             return False
 
+        # char ids that need char info in the character table
+        char_ids = [alt_char_id]
+
         sender_row = self.get_alt_status(sender_char_id)
         if sender_row:
             if sender_row['status'] == self.MAIN or sender_row['status'] == self.VALIDATED:
@@ -51,15 +55,15 @@ class AltsManager:
             # main does not exist, create entry for it
             group_id = self.get_next_group_id()
             self.db.insert('alts', {'char_id': sender_char_id, 'group_id': group_id, 'status': self.MAIN})
-
-            # make sure char info exists in character table
-            self.pork_manager.load_character_info(sender_char_id)
+            char_ids.append(sender_char_id)
 
             params = [alt_char_id, group_id, self.VALIDATED]
 
-        # make sure char info exists in character table
-        self.pork_manager.load_character_info(alt_char_id)
+        # make sure char info exists in character table, without waiting for PORK. Missing char info is saved as a
+        # placeholder until it has been requested
+        self.pork_manager.load_character_infos(char_ids, timeout=0)
         self.db.insert('alts', {'char_id': params[0], 'group_id': params[1], 'status': params[2]})
+        self.access_manager.clear_cache()
         return True
 
     def remove_alt(self, sender_char_id, alt_char_id):
@@ -75,6 +79,7 @@ class AltsManager:
             return False
 
         self.db.delete('alts', {'char_id': alt_char_id})
+        self.access_manager.clear_cache()
         return True
 
     def get_alt_status(self, char_id):
@@ -0,0 +1,103 @@
+import asyncio
+import struct
+
+
+class AsyncioTransport:
+    """
+    Transport built on asyncio streams.
+
+    The event loop is owned by the transport and only runs while the bot is waiting on it, so the rest of the bot
+    stays single-threaded. A frame that is only partially received when a wait times out is not lost; the pending
+    read is resumed on the next call to read_frame().
+    """
+
+    def __init__(self):
+        self.loop = None
+        self.reader = None
+        self.writer = None
+        self.read_task = None
+        self.wakeup_event = None
+
+    def connect(self, host, port):
+        self.loop = asyncio.new_event_loop()
+        self.wakeup_event = asyncio.Event()
+        self.reader, self.writer = self.loop.run_until_complete(
+            asyncio.wait_for(asyncio.open_connection(host, port), 10))
+
+    def disconnect(self):
+        if self.read_task:
+            self.read_task.cancel()
+            self.read_task = None
+
+        if self.writer:
+            self.writer.close()
+            try:
+                self.loop.run_until_complete(self.writer.wait_closed())
+            except (ConnectionError, asyncio.CancelledError):
+                pass
+            self.reader = None
+            self.writer = None
+
+        if self.loop:
+            self.loop.close()
+            self.loop = None
+            self.wakeup_event = None
+
+    def read_frame(self, timeout, want_write=False):
+        """
+        Wait up to timeout seconds for a frame from the server. If `want_write` is set, also stop waiting as soon as
+        the write buffer has drained. A call to wakeup() also ends the wait.
+
+        Returns a tuple of (packet_type, data), or None if no complete frame arrived.
+        """
+
+        if self.read_task is None:
+            self.read_task = self.loop.create_task(self._read_frame())
+
+        tasks = {self.read_task, self.loop.create_task(self.wakeup_event.wait())}
+        if want_write:
+            tasks.add(self.loop.create_task(self.writer.drain()))
+
+        done, pending = self.loop.run_until_complete(
+            asyncio.wait(tasks, timeout=timeout, return_when=asyncio.FIRST_COMPLETED))
+        for task in pending:
+            if task is not self.read_task:
+                task.cancel()
+        self.wakeup_event.clear()
+
+        if not self.read_task.done():
+            return None
+
+        task, self.read_task = self.read_task, None
+        return task.result()
+
+    def wakeup(self):
+        """
+        Interrupt a read_frame() that is waiting in another thread.
+        """
+
+        loop, wakeup_event = self.loop, self.wakeup_event
+        if loop and wakeup_event:
+            try:
+                loop.call_soon_threadsafe(wakeup_event.set)
+            except RuntimeError:
+                # the loop was closed in the meantime
+                pass
+
+    def is_writable(self):
+        low, high = self.writer.transport.get_write_buffer_limits()
+        return self.writer.transport.get_write_buffer_size() <= high
+
+    def write_frame(self, packet_type, data):
+        self.writer.write(struct.pack(">2H", packet_type, len(data)) + data)
+        self.loop.run_until_complete(self.writer.drain())
+
+    async def _read_frame(self):
+        try:
+            head = await self.reader.readexactly(4)
+            packet_type, packet_length = struct.unpack(">2H", head)
+            data = await self.reader.readexactly(packet_length)
+        except asyncio.IncompleteReadError:
+            raise EOFError
+
+        return packet_type, data
@@ -1,28 +1,29 @@
-import socket
-import struct
-import select
 from core.aochat.server_packets import ServerPacket, LoginOK
 from core.aochat.client_packets import LoginRequest, LoginSelect
 from tools.logger import Logger
 from core.aochat.crypt import generate_login_key
+from core.aochat.transport import SocketTransport
+from time import time as timer
+import collections
 
 
 class Bot:
     def __init__(self):
-        self.socket = None
+        self.transport = SocketTransport()
+        self.dropped_packet_ids = collections.Counter()
         self.char_id = None
         self.char_name = None
         self.logger = Logger("Mangopie")
 
+    def set_transport(self, transport):
+        self.transport = transport
+
     def connect(self, host, port):
         self.logger.info("Connecting to %s:%d" % (host, port))
-        self.socket = socket.create_connection((host, port), 10)
+        self.transport.connect(host, port)
 
     def disconnect(self):
-        if self.socket:
-            self.socket.shutdown(socket.SHUT_RDWR)
-            self.socket.close()
-            self.socket = None
+        self.transport.disconnect()
 
     def login(self, username, password, character):
         character = character.capitalize()
@@ -56,51 +57,36 @@ class Bot:
             self.logger.error("Error logging in: %s" % packet.message)
             return False
 
-    def read_packet(self, time=1):
-        """
-        Wait for packet from server.
+    def read_packet(self, time=1, want_write=False):
         """
+        Wait up to `time` seconds for packet from server. If `want_write` is set, also return as soon as the connection
+        is writable.
 
-        read, write, error = select.select([self.socket], [], [], time)
-        if not read:
-            return None
-        else:
-            # Read data from server
-            head = self.read_bytes(4)
-            packet_type, packet_length = struct.unpack(">2H", head)
-            data = self.read_bytes(packet_length)
-
-            packet = ServerPacket.get_instance(packet_type, data)
-            return packet
-
-    def send_packet(self, packet):
-        data = packet.to_bytes()
-        data = struct.pack(">2H", packet.id, len(data)) + data
-
-        self.write_bytes(data)
-
-    def read_bytes(self, num_bytes):
-        data = bytes()
-
-        while num_bytes > 0:
-            chunk = self.socket.recv(num_bytes)
-
-            if len(chunk) == 0:
-                raise EOFError
-
-            num_bytes -= len(chunk)
-            data = data + chunk
+        Packets without subscribers are dropped right after their header is read, without being decoded. Packets of an
+        unknown type are counted in `ServerPacket.unknown_packet_ids` and dropped.
+        """
 
-        return data
+        deadline = None if time is None else timer() + time
+        while True:
+            frame = self.transport.read_frame(time, want_write)
+            if frame is None:
+                return None
 
-    def write_bytes(self, data):
-        num_bytes = len(data)
+            packet_type, data = frame
+            if packet_type not in ServerPacket.packet_types:
+                ServerPacket.unknown_packet_ids[packet_type] += 1
+                if ServerPacket.unknown_packet_ids[packet_type] == 1:
+                    self.logger.warning("Received unknown packet type %d" % packet_type)
+            elif self.has_packet_subscribers(packet_type):
+                return ServerPacket.get_instance(packet_type, data)
+            else:
+                self.dropped_packet_ids[packet_type] += 1
 
-        while num_bytes > 0:
-            sent = self.socket.send(data)
+            if deadline is not None:
+                time = max(0, deadline - timer())
 
-            if sent == 0:
-                raise EOFError
+    def has_packet_subscribers(self, packet_id):
+        return True
 
-            data = data[sent:]
-            num_bytes -= sent
+    def send_packet(self, packet):
+        self.transport.write_frame(packet.id, packet.to_bytes())
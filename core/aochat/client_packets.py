@@ -1,7 +1,11 @@
 from core.aochat.packets import *
+import collections
 
 
 class ClientPacket(Packet):
+    packet_types = {}
+    unknown_packet_ids = collections.Counter()
+
     def __init__(self, packet_id, types, args):
         self.id = packet_id
         self.types = types
@@ -13,41 +17,6 @@ class ClientPacket(Packet):
     def __str__(self):
         return "ClientPacket(%d): %s" % (self.id, self.args)
 
-    @classmethod
-    def get_instance(cls, packet_id, data):
-        if packet_id == LoginRequest.id:
-            LoginRequest.from_bytes(data)
-        elif packet_id == LoginSelect.id:
-            LoginSelect.from_bytes(data)
-        elif packet_id == CharacterLookup.id:
-            CharacterLookup.from_bytes(data)
-        elif packet_id == PrivateMessage.id:
-            PrivateMessage.from_bytes(data)
-        elif packet_id == BuddyAdd.id:
-            BuddyAdd.from_bytes(data)
-        elif packet_id == BuddyRemove.id:
-            BuddyRemove.from_bytes(data)
-        elif packet_id == PrivateChannelInvite.id:
-            PrivateChannelInvite.from_bytes(data)
-        elif packet_id == PrivateChannelKick.id:
-            PrivateChannelKick.from_bytes(data)
-        elif packet_id == PrivateChannelJoin.id:
-            PrivateChannelJoin.from_bytes(data)
-        elif packet_id == PrivateChannelLeave.id:
-            PrivateChannelLeave.from_bytes(data)
-        elif packet_id == PrivateChannelKickAll.id:
-            PrivateChannelKickAll.from_bytes(data)
-        elif packet_id == PrivateChannelMessage.id:
-            PrivateChannelMessage.from_bytes(data)
-        elif packet_id == PublicChannelMessage.id:
-            PublicChannelMessage.from_bytes(data)
-        elif packet_id == Ping.id:
-            Ping.from_bytes(data)
-        elif packet_id == ChatCommand.id:
-            ChatCommand.from_bytes(data)
-        else:
-            return None
-
 
 class LoginRequest(ClientPacket):
     id = 2
@@ -61,7 +30,7 @@ class LoginRequest(ClientPacket):
 
     @classmethod
     def from_bytes(cls, data):
-        args = decode_args(cls.types, data)
+        args = cls.codec.decode(data)
         return cls(*args)
 
 
@@ -75,7 +44,7 @@ class LoginSelect(ClientPacket):
 
     @classmethod
     def from_bytes(cls, data):
-        args = decode_args(cls.types, data)
+        args = cls.codec.decode(data)
         return cls(*args)
 
 
@@ -89,7 +58,7 @@ class CharacterLookup(ClientPacket):
 
     @classmethod
     def from_bytes(cls, data):
-        args = decode_args(cls.types, data)
+        args = cls.codec.decode(data)
         return cls(*args)
 
 
@@ -105,7 +74,7 @@ class PrivateMessage(ClientPacket):
 
     @classmethod
     def from_bytes(cls, data):
-        args = decode_args(cls.types, data)
+        args = cls.codec.decode(data)
         return cls(*args)
 
 
@@ -120,7 +89,7 @@ class BuddyAdd(ClientPacket):
 
     @classmethod
     def from_bytes(cls, data):
-        args = decode_args(cls.types, data)
+        args = cls.codec.decode(data)
         return cls(*args)
 
 
@@ -134,7 +103,7 @@ class BuddyRemove(ClientPacket):
 
     @classmethod
     def from_bytes(cls, data):
-        args = decode_args(cls.types, data)
+        args = cls.codec.decode(data)
         return cls(*args)
 
 
@@ -148,7 +117,7 @@ class PrivateChannelInvite(ClientPacket):
 
     @classmethod
     def from_bytes(cls, data):
-        args = decode_args(cls.types, data)
+        args = cls.codec.decode(data)
         return cls(*args)
 
 
@@ -162,7 +131,7 @@ class PrivateChannelKick(ClientPacket):
 
     @classmethod
     def from_bytes(cls, data):
-        args = decode_args(cls.types, data)
+        args = cls.codec.decode(data)
         return cls(*args)
 
 
@@ -176,7 +145,7 @@ class PrivateChannelJoin(ClientPacket):
 
     @classmethod
     def from_bytes(cls, data):
-        args = decode_args(cls.types, data)
+        args = cls.codec.decode(data)
         return cls(*args)
 
 
@@ -190,7 +159,7 @@ class PrivateChannelLeave(ClientPacket):
 
     @classmethod
     def from_bytes(cls, data):
-        args = decode_args(cls.types, data)
+        args = cls.codec.decode(data)
         return cls(*args)
 
 
@@ -218,7 +187,7 @@ class PrivateChannelMessage(ClientPacket):
 
     @classmethod
     def from_bytes(cls, data):
-        args = decode_args(cls.types, data)
+        args = cls.codec.decode(data)
         return cls(*args)
 
 
@@ -234,7 +203,7 @@ class PublicChannelMessage(ClientPacket):
 
     @classmethod
     def from_bytes(cls, data):
-        args = decode_args(cls.types, data)
+        args = cls.codec.decode(data)
         return cls(*args)
 
 
@@ -248,7 +217,7 @@ class Ping(ClientPacket):
 
     @classmethod
     def from_bytes(cls, data):
-        args = decode_args(cls.types, data)
+        args = cls.codec.decode(data)
         return cls(*args)
 
 
@@ -262,5 +231,5 @@ class ChatCommand(ClientPacket):
 
     @classmethod
     def from_bytes(cls, data):
-        args = decode_args(cls.types, data)
+        args = cls.codec.decode(data)
         return cls(*args)
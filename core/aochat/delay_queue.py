@@ -1,22 +1,104 @@
+import collections
 import time
 
 
 class DelayQueue:
+    """
+    Rate limited queue for outgoing packets.
+
+    A token bucket lets up to `burst` items through ahead of the steady rate of one item every `delay` seconds.
+    Items are dequeued by priority, and destinations with the same priority are served round-robin, so one destination
+    with many queued items (eg. a long blob) does not hold up everyone else.
+    """
+
+    PRIORITY_HIGH = 0
+    PRIORITY_NORMAL = 1
+    PRIORITY_LOW = 2
+
     def __init__(self, delay: int, burst=0):
         self.delay = delay
         self.burst = burst
-        self.items = []
-        self.next_packet = 0
+        # one token for the item sent now, plus `burst` items ahead of the rate
+        self.capacity = burst + 1
+        self.tokens = self.capacity
+        self.last_refill = time.time()
+        self.size = 0
 
-    def enqueue(self, item):
-        time_with_burst = time.time() - (self.burst * self.delay)
-        if self.next_packet < time_with_burst:
-            self.next_packet = time_with_burst
-        self.items.insert(0, item)
+        # metrics
+        self.num_dequeued = 0
+        self.total_wait = 0
+        self.max_wait = 0
 
-    def dequeue(self):
-        if self.items and time.time() > self.next_packet:
-            self.next_packet += self.delay
-            return self.items.pop()
+        # for each priority: a deque of items per destination, and the round-robin order of the destinations
+        self.items = [{}, {}, {}]
+        self.destinations = [collections.deque(), collections.deque(), collections.deque()]
+
+    def __len__(self):
+        return self.size
+
+    def enqueue(self, item, destination=None, priority=PRIORITY_NORMAL):
+        items = self.items[priority]
+        entry = (item, time.time())
+        if destination in items:
+            items[destination].append(entry)
         else:
+            items[destination] = collections.deque([entry])
+            self.destinations[priority].append(destination)
+        self.size += 1
+
+    def dequeue(self):
+        if not self.size:
             return None
+
+        self._refill()
+        if self.tokens < 1:
+            return None
+
+        for items, destinations in zip(self.items, self.destinations):
+            if destinations:
+                destination = destinations.popleft()
+                destination_items = items[destination]
+                item, enqueued_at = destination_items.popleft()
+                if destination_items:
+                    destinations.append(destination)
+                else:
+                    del items[destination]
+
+                self.tokens -= 1
+                self.size -= 1
+
+                wait = self.last_refill - enqueued_at
+                self.num_dequeued += 1
+                self.total_wait += wait
+                self.max_wait = max(self.max_wait, wait)
+                return item
+
+    def get_next_dequeue_time(self):
+        """
+        Returns the time at which the next item can be dequeued, or None if the queue is empty.
+        """
+
+        if not self.size:
+            return None
+
+        self._refill()
+        if self.tokens >= 1:
+            return self.last_refill
+        else:
+            return self.last_refill + (1 - self.tokens) * self.delay
+
+    def get_stats(self):
+        return {
+            "depth": self.size,
+            "dequeued": self.num_dequeued,
+            "average_wait": self.total_wait / self.num_dequeued if self.num_dequeued else 0,
+            "max_wait": self.max_wait
+        }
+
+    def _refill(self):
+        now = time.time()
+        if self.delay > 0:
+            self.tokens = min(self.capacity, self.tokens + (now - self.last_refill) / self.delay)
+        else:
+            self.tokens = self.capacity
+        self.last_refill = now
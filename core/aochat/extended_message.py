@@ -1,9 +1,12 @@
 class ExtendedMessage:
-    def __init__(self, category_id, instance_id, template, params):
+    def __init__(self, category_id, instance_id, template, params, message=None):
         self.category_id = category_id
         self.instance_id = instance_id
         self.template = template
         self.params = params
+        self.message = message
 
     def get_message(self):
-        return self.template % tuple(self.params)
+        if self.message is None:
+            self.message = self.template % tuple(self.params)
+        return self.message
@@ -1,130 +1,166 @@
+from core.aochat.extended_message import ExtendedMessage
+from tools.cache import LRUCache
+import mmap
 import struct
 
 
 class MMDBParser:
+    TEMPLATE_CACHE_SIZE = 1000
+    PARAMS_CACHE_SIZE = 1000
+    MESSAGE_CACHE_SIZE = 1000
+
+    # value of a base 85 number with all 5 digits set to 0, which is '!' (33)
+    BASE_85_OFFSET = 33 * (85 ** 4 + 85 ** 3 + 85 ** 2 + 85 + 1)
+
     def __init__(self, filename):
         self.filename = filename
+        self.mmap = None
+        # (category_id, instance_id) -> offset of the message string
+        self.offsets = None
+        # (category_id, instance_id) -> message string
+        self.templates = LRUCache(self.TEMPLATE_CACHE_SIZE)
+        # param string -> tuple of decoded params
+        self.params = LRUCache(self.PARAMS_CACHE_SIZE)
+        # (category_id, instance_id, param string) -> formatted message
+        self.messages = LRUCache(self.MESSAGE_CACHE_SIZE)
+
+    def start(self):
+        self.load()
+
+    def stop(self):
+        if self.mmap:
+            self.mmap.close()
+            self.mmap = None
+            self.offsets = None
+            self.templates.clear()
+            self.params.clear()
+            self.messages.clear()
+
+    def load(self):
+        with open(self.filename, "rb") as file:
+            self.mmap = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        # the category table is a list of (id, offset) entries, each offset pointing at the entry table of that
+        # category, which ends where the entry table of the next category starts
+        num_categories = self.read_int(4)
+        categories = [self.read_entry(8 + i * 8) for i in range(0, num_categories)]
+
+        self.offsets = {}
+        for (category_id, offset), (_, next_offset) in zip(categories, categories[1:]):
+            for entry_offset in range(offset, next_offset, 8):
+                instance_id, string_offset = self.read_entry(entry_offset)
+                self.offsets[(category_id, instance_id)] = string_offset
 
     def get_message_string(self, category_id, instance_id):
-        with open(self.filename, "rb") as file:
-            categories = self.get_categories(file)
-
-            try:
-                category = next(categories)
-                while category["id"] != category_id:
-                    category = next(categories)
-                next_category = next(categories)
-            except StopIteration:
+        key = (category_id, instance_id)
+        message = self.templates.get(key)
+        if message is None:
+            if self.offsets is None:
+                self.load()
+
+            offset = self.offsets.get(key, None)
+            if offset is None:
                 return None
 
-            instance = self.find_entry(file, instance_id, category["offset"], next_category["offset"])
+            message = self.read_string(offset)
+            self.templates.set(key, message)
 
-            if instance:
-                file.seek(instance["offset"])
-                return self.read_string(file)
-            else:
-                return None
+        return message
+
+    def format_message(self, category_id, instance_id, param_str):
+        key = (category_id, instance_id, param_str)
+        message = self.messages.get(key)
+        if message is None:
+            template = self.get_message_string(category_id, instance_id)
+            if not template:
+                raise Exception("Could not find message string for category '%s' and instance '%s'" % (category_id, instance_id))
+
+            message = template % tuple(self.parse_params(param_str))
+            self.messages.set(key, message)
+
+        return message
+
+    def parse_extended_message(self, msg):
+        category_id = self.read_base_85(msg, 0)
+        instance_id = self.read_base_85(msg, 5)
+        param_str = msg[10:]
+        return ExtendedMessage(category_id, instance_id, self.get_message_string(category_id, instance_id),
+                               self.parse_params(param_str), self.format_message(category_id, instance_id, param_str))
 
     def get_all_message_strings(self):
-        with open(self.filename, "rb") as file:
-            categories = iter(list(self.get_categories(file)))
-            next_category = next(categories)
-
-            while True:
-                try:
-                    category = next_category
-                    next_category = next(categories)
-                except StopIteration:
-                    break
-
-                max_offset = next_category["offset"]
-                file.seek(category["offset"])
-
-                instances = []
-                while file.tell() < max_offset:
-                    entry = self.read_entry(file)
-                    instances.append(entry)
-
-                for instance in instances:
-                    file.seek(instance["offset"])
-                    message_string = self.read_string(file)
-                    print([category["id"], instance["id"], message_string])
-
-    def find_entry(self, file, entry_id, min_offset, max_offset):
-        file.seek(min_offset)
-        entry = self.read_entry(file)
-        while file.tell() <= max_offset:
-            if entry["id"] == entry_id:
-                return entry
-            entry = self.read_entry(file)
-
-        return None
-
-    def get_categories(self, file):
-        file.seek(4)
-        num_categories = self.read_int(file)
-        for i in range(0, num_categories):
-            yield self.read_entry(file)
-
-    def read_entry(self, file):
-        return {"id": self.read_int(file), "offset": self.read_int(file)}
-
-    def read_int(self, file):
-        return int.from_bytes(file.read(4), byteorder="little")
-
-    def read_string(self, file):
-        message = bytearray()
-        char = file.read(1)
-        i = 0
-        while char and char != b'\x00':
-            i += 1
-            message.append(ord(char))
-            char = file.read(1)
-
-        return message.decode("ISO-8859-1")
-
-    def read_base_85(self, num_str):
-        n = 0
-        for i in range(0, 5):
-            n = n * 85 + ord(num_str[i]) - 33
-        return n
+        if self.offsets is None:
+            self.load()
+
+        for (category_id, instance_id), offset in self.offsets.items():
+            print([category_id, instance_id, self.read_string(offset)])
+
+    def read_entry(self, offset):
+        return struct.unpack_from("<II", self.mmap, offset)
+
+    def read_int(self, offset):
+        return struct.unpack_from("<I", self.mmap, offset)[0]
+
+    def read_string(self, offset):
+        end = self.mmap.find(b"\x00", offset)
+        if end == -1:
+            end = len(self.mmap)
+
+        return str(memoryview(self.mmap)[offset:end], "ISO-8859-1")
+
+    def read_base_85(self, num_str, offset=0):
+        return ((((ord(num_str[offset]) * 85 +
+                   ord(num_str[offset + 1])) * 85 +
+                  ord(num_str[offset + 2])) * 85 +
+                 ord(num_str[offset + 3])) * 85 +
+                ord(num_str[offset + 4])) - self.BASE_85_OFFSET
 
     def parse_params(self, param_str):
+        params = self.params.get(param_str)
+        if params is None:
+            params = self.decode_params(param_str)
+            self.params.set(param_str, params)
+
+        # callers get their own list so the cached params can not be modified
+        return list(params)
+
+    def decode_params(self, param_str):
         args = []
-        while param_str:
-            data_type = param_str[0]
-            param_str = param_str[1:]
+        offset = 0
+        length = len(param_str)
+        while offset < length:
+            data_type = param_str[offset]
+            offset += 1
             if data_type == "S":
-                size = ord(param_str[0]) * 256 + ord(param_str[1])
-                args.append(param_str[2:2 + size])
-                param_str = param_str[2 + size:]
+                size = ord(param_str[offset]) * 256 + ord(param_str[offset + 1])
+                args.append(param_str[offset + 2:offset + 2 + size])
+                offset += 2 + size
             elif data_type == "s":
-                size = ord(param_str[0]) - 1  # size is 1 less than indicated
-                args.append(param_str[1:1 + size])
-                param_str = param_str[1 + size:]
+                size = ord(param_str[offset]) - 1  # size is 1 less than indicated
+                args.append(param_str[offset + 1:offset + 1 + size])
+                offset += 1 + size
             elif data_type == "I":
-                args.append(struct.unpack(">I", param_str[:4].encode("latin-1"))[0])
-                param_str = param_str[4:]
+                args.append(struct.unpack(">I", param_str[offset:offset + 4].encode("latin-1"))[0])
+                offset += 4
             elif data_type == "i" or data_type == "u":
-                args.append(self.read_base_85(param_str[:5]))
-                param_str = param_str[5:]
+                args.append(self.read_base_85(param_str, offset))
+                offset += 5
             elif data_type == "R":
-                category_id = self.read_base_85(param_str[:5])
-                instance_id = self.read_base_85(param_str[5:10])
+                category_id = self.read_base_85(param_str, offset)
+                instance_id = self.read_base_85(param_str, offset + 5)
                 message = self.get_message_string(category_id, instance_id)
                 if not message:
                     raise Exception("Could not find message string for category '%s' and instance '%s'" % (category_id, instance_id))
                 args.append(message)
-                param_str = param_str[10:]
+                offset += 10
             elif data_type == "l":
                 category_id = 20000
-                instance_id = struct.unpack(">I", param_str[:4].encode("latin-1"))[0]
+                instance_id = struct.unpack(">I", param_str[offset:offset + 4].encode("latin-1"))[0]
                 message = self.get_message_string(category_id, instance_id)
                 if not message:
                     raise Exception("Could not find message string for category '%s' and instance '%s'" % (category_id, instance_id))
                 args.append(message)
-                param_str = param_str[5:]
+                offset += 5
             else:
                 raise Exception("Unknown argument type '%s'" % data_type)
 
-        return args
+        return tuple(args)
@@ -0,0 +1,45 @@
+from core.aochat.delay_queue import DelayQueue
+
+
+class PacketQueue:
+    """
+    Pipeline for all outgoing client packets.
+
+    Packets are routed to a lane by their class, and every lane is a DelayQueue with its own rate limit, so eg. a flood
+    of buddy adds does not use up the rate limit for chat messages.
+    """
+
+    def __init__(self):
+        self.lanes = {}
+        self.packet_lanes = {}
+        self.default_lane = None
+
+    def add_lane(self, name, delay, burst, packet_classes, default=False):
+        self.lanes[name] = DelayQueue(delay, burst)
+        for packet_class in packet_classes:
+            self.packet_lanes[packet_class.id] = name
+        if default:
+            self.default_lane = name
+
+    def get_lane(self, packet):
+        return self.lanes[self.packet_lanes.get(packet.id, self.default_lane)]
+
+    def __len__(self):
+        return sum(map(len, self.lanes.values()))
+
+    def enqueue(self, packet, destination=None, priority=DelayQueue.PRIORITY_NORMAL):
+        self.get_lane(packet).enqueue(packet, destination, priority)
+
+    def dequeue(self):
+        for lane in self.lanes.values():
+            packet = lane.dequeue()
+            if packet:
+                return packet
+        return None
+
+    def get_next_dequeue_time(self):
+        times = [t for t in map(lambda lane: lane.get_next_dequeue_time(), self.lanes.values()) if t is not None]
+        return min(times) if times else None
+
+    def get_stats(self):
+        return {name: lane.get_stats() for name, lane in self.lanes.items()}
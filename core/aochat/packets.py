@@ -1,4 +1,5 @@
 import struct
+import itertools
 
 
 class UnknownArgumentType(Exception):
@@ -9,80 +10,203 @@ class PacketMissingArgument(Exception):
     pass
 
 
-def decode_args(types, data):
-    args = []
-    for argtype in types:
-        if argtype == "I":
-            elem, data = data[:4], data[4:]
-            result = struct.unpack(">I", elem)[0]
-
-        elif argtype == "S":
-            length = struct.unpack(">H", data[:2])[0]
-            result = data[2:2 + length].decode('iso-8859-1')
-            data = data[2 + length:]
-
-        elif argtype == "G":
-            result, data = data[:5], data[5:]
-            # Convert result (5 bytes) to a long.  Can't use
-            # struct.unpack(">Q", "\x00"*3 + result), since we
-            # can't rely on "long long" being available.
-            high, low = struct.unpack(">BI", result)
-            result = (high << 32) + low
-
-        elif argtype == "i":
-            length = struct.unpack(">H", data[:2])[0]
-            result = struct.unpack(">%sI" % length, data[2:2 + 4 * length])
-            data = data[2 + 4 * length:]
-
-        elif argtype == "s":
-            length = struct.unpack(">H", data[:2])[0]
-            data = data[2:]
-            result = []
-            while length:
-                slength = struct.unpack(">H", data[:2])[0]
-                result.append(data[2:2 + slength].decode('iso-8859-1'))
-                data = data[2 + slength:]
-                length -= 1
+_UINT16 = struct.Struct(">H")
+_UINT32 = struct.Struct(">I")
+_UINT40 = struct.Struct(">BI")
 
-        else:
-            raise UnknownArgumentType(argtype)
 
-        args.append(result)
+def _read_uints(count):
+    fmt = struct.Struct(">%dI" % count)
 
-    return args
+    def read(data, offset, args):
+        args.extend(fmt.unpack_from(data, offset))
+        return offset + fmt.size
 
+    return read
 
-def encode_args(types, args):
-    data = b""
 
-    for argtype in types:
-        if not args:
+def _read_uint(data, offset, args):
+    args.append(_UINT32.unpack_from(data, offset)[0])
+    return offset + 4
+
+
+def _read_string(data, offset, args):
+    length = _UINT16.unpack_from(data, offset)[0]
+    offset += 2
+    args.append(str(data[offset:offset + length], 'iso-8859-1'))
+    return offset + length
+
+
+def _read_uint40(data, offset, args):
+    # 5 byte integer, used for channel ids
+    high, low = _UINT40.unpack_from(data, offset)
+    args.append((high << 32) + low)
+    return offset + 5
+
+
+def _read_uint_array(data, offset, args):
+    length = _UINT16.unpack_from(data, offset)[0]
+    offset += 2
+    args.append(struct.unpack_from(">%dI" % length, data, offset))
+    return offset + 4 * length
+
+
+def _read_string_array(data, offset, args):
+    length = _UINT16.unpack_from(data, offset)[0]
+    offset += 2
+    result = []
+    for i in range(length):
+        offset = _read_string(data, offset, result)
+    args.append(result)
+    return offset
+
+
+def _skip_string(data, offset):
+    return offset + 2 + _UINT16.unpack_from(data, offset)[0]
+
+
+def _skip_uint_array(data, offset):
+    return offset + 2 + 4 * _UINT16.unpack_from(data, offset)[0]
+
+
+def _skip_string_array(data, offset):
+    length = _UINT16.unpack_from(data, offset)[0]
+    offset += 2
+    for i in range(length):
+        offset = _skip_string(data, offset)
+    return offset
+
+
+def _write_uint(data, it):
+    data += _UINT32.pack(it)
+
+
+def _write_string(data, it):
+    encoded = it.encode('utf-8')
+    data += _UINT16.pack(len(encoded))
+    data += encoded
+
+
+def _write_uint40(data, it):
+    data += _UINT40.pack(it >> 32, it & 0xffffffff)
+
+
+def _write_uint_array(data, it):
+    data += _UINT16.pack(len(it))
+    data += struct.pack(">%dI" % len(it), *it)
+
+
+def _write_string_array(data, it):
+    data += _UINT16.pack(len(it))
+    for it_elem in it:
+        _write_string(data, it_elem)
+
+
+_readers = {"I": _read_uint, "S": _read_string, "G": _read_uint40, "i": _read_uint_array, "s": _read_string_array}
+_sizes = {"I": 4, "G": 5}
+_skippers = {"S": _skip_string, "i": _skip_uint_array, "s": _skip_string_array}
+_writers = {"I": _write_uint, "S": _write_string, "G": _write_uint40, "i": _write_uint_array, "s": _write_string_array}
+
+
+class PacketCodec:
+    """
+    Decoder and encoder for a packet type signature (eg. "IISS"), compiled once per signature.
+
+    Runs of "I" are read with a single struct, and the buffer is walked with an offset instead of being sliced.
+    Single fields can be decoded with decode_field(), which skips over the fields in front of it without decoding them.
+    """
+
+    def __init__(self, types):
+        self.types = types
+        self.readers = []
+        self.writers = []
+        self.field_offsets = []
+
+        offset = 0
+        for argtype in types:
+            if argtype not in _writers:
+                raise UnknownArgumentType(argtype)
+            self.writers.append(_writers[argtype])
+
+            # offset of each field, as long as all the fields in front of it have a fixed size
+            self.field_offsets.append(offset)
+            if offset is not None and argtype in _sizes:
+                offset += _sizes[argtype]
+            else:
+                offset = None
+
+        for argtype, group in itertools.groupby(types):
+            count = sum(1 for _ in group)
+            if argtype == "I":
+                self.readers.append(_read_uints(count))
+            else:
+                self.readers.extend([_readers[argtype]] * count)
+
+    def decode(self, data):
+        args = []
+        offset = 0
+        for reader in self.readers:
+            offset = reader(data, offset, args)
+        return args
+
+    def decode_field(self, data, index):
+        offset = self.field_offsets[index]
+        if offset is None:
+            offset = 0
+            for argtype in self.types[:index]:
+                if argtype in _sizes:
+                    offset += _sizes[argtype]
+                else:
+                    offset = _skippers[argtype](data, offset)
+
+        args = []
+        _readers[self.types[index]](data, offset, args)
+        return args[0]
+
+    def encode(self, args):
+        if len(args) < len(self.writers):
             raise PacketMissingArgument
 
-        it = args[0]
-        del args[0]
+        data = bytearray()
+        for writer, it in zip(self.writers, args):
+            writer(data, it)
+        return data
 
-        if argtype == "I":
-            data += struct.pack(">I", it)
 
-        elif argtype == "S":
-            data += struct.pack(">H", len(it))
-            data += it.encode('utf-8')
+_codecs = {}
 
-        elif argtype == "G":
-            data += struct.pack(">BI", it >> 32, it & 0xffffffff)
 
-        elif argtype == "s":
-            data += struct.pack(">H", len(it))
-            for it_elem in it:
-                data += struct.pack(">H", len(it_elem))
-                data += it_elem.encode('utf-8')
+def get_codec(types):
+    codec = _codecs.get(types, None)
+    if codec is None:
+        codec = PacketCodec(types)
+        _codecs[types] = codec
+    return codec
 
-        else:
-            raise UnknownArgumentType(argtype)
 
-    return data
+def decode_args(types, data):
+    return get_codec(types).decode(data)
+
+
+def encode_args(types, args):
+    return get_codec(types).encode(args)
 
 
 class Packet:
-    pass
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        if "types" in cls.__dict__:
+            cls.codec = get_codec(cls.types)
+
+        # register concrete packet classes with the registry of their base class (eg. ServerPacket, ClientPacket)
+        if "id" in cls.__dict__:
+            cls.packet_types[cls.id] = cls
+
+    @classmethod
+    def get_instance(cls, packet_id, data):
+        packet_type = cls.packet_types.get(packet_id, None)
+        if packet_type is None:
+            cls.unknown_packet_ids[packet_id] += 1
+            return None
+        else:
+            return packet_type.from_bytes(data)
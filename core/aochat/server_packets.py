@@ -1,7 +1,51 @@
 from core.aochat.packets import *
+import collections
+import inspect
+
+
+class LazyField:
+    """
+    Decodes a field from the raw packet data the first time it is accessed.
+
+    The decoded value is stored on the instance, which shadows this descriptor for subsequent reads.
+    """
+
+    def __init__(self, name, index):
+        self.name = name
+        self.index = index
+
+    def __get__(self, packet, owner):
+        if packet is None:
+            return self
+
+        value = packet.codec.decode_field(packet.data, self.index)
+        packet.__dict__[self.name] = value
+        return value
+
+
+class LazyArgs:
+    def __get__(self, packet, owner):
+        if packet is None:
+            return self
+
+        value = [getattr(packet, name) for name in packet.fields]
+        packet.__dict__["args"] = value
+        return value
 
 
 class ServerPacket(Packet):
+    packet_types = {}
+    unknown_packet_ids = collections.Counter()
+    fields = []
+    args = LazyArgs()
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        # field names are taken from the constructor, and are in the same order as `types`
+        cls.fields = list(inspect.signature(cls.__init__).parameters)[1:]
+        for index, name in enumerate(cls.fields):
+            setattr(cls, name, LazyField(name, index))
+
     def __init__(self, packet_id, types, args):
         self.id = packet_id
         self.types = types
@@ -14,59 +58,14 @@ class ServerPacket(Packet):
         return "ServerPacket(%d): %s" % (self.id, self.args)
 
     @classmethod
-    def get_instance(cls, packet_id, data):
-        if packet_id == LoginSeed.id:
-            return LoginSeed.from_bytes(data)
-        elif packet_id == LoginOK.id:
-            return LoginOK.from_bytes(data)
-        elif packet_id == LoginError.id:
-            return LoginError.from_bytes(data)
-        elif packet_id == LoginCharacterList.id:
-            return LoginCharacterList.from_bytes(data)
-        elif packet_id == CharacterUnknown.id:
-            return CharacterUnknown.from_bytes(data)
-        elif packet_id == CharacterName.id:
-            return CharacterName.from_bytes(data)
-        elif packet_id == CharacterLookup.id:
-            return CharacterLookup.from_bytes(data)
-        elif packet_id == PrivateMessage.id:
-            return PrivateMessage.from_bytes(data)
-        elif packet_id == VicinityMessage.id:
-            return VicinityMessage.from_bytes(data)
-        elif packet_id == BroadcastMessage.id:
-            return BroadcastMessage.from_bytes(data)
-        elif packet_id == SimpleSystemMessage.id:
-            return SimpleSystemMessage.from_bytes(data)
-        elif packet_id == SystemMessage.id:
-            return SystemMessage.from_bytes(data)
-        elif packet_id == BuddyAdded.id:
-            return BuddyAdded.from_bytes(data)
-        elif packet_id == BuddyRemoved.id:
-            return BuddyRemoved.from_bytes(data)
-        elif packet_id == PrivateChannelInvited.id:
-            return PrivateChannelInvited.from_bytes(data)
-        elif packet_id == PrivateChannelKicked.id:
-            return PrivateChannelKicked.from_bytes(data)
-        elif packet_id == PrivateChannelLeft.id:
-            return PrivateChannelLeft.from_bytes(data)
-        elif packet_id == PrivateChannelClientJoined.id:
-            return PrivateChannelClientJoined.from_bytes(data)
-        elif packet_id == PrivateChannelClientLeft.id:
-            return PrivateChannelClientLeft.from_bytes(data)
-        elif packet_id == PrivateChannelMessage.id:
-            return PrivateChannelMessage.from_bytes(data)
-        elif packet_id == PrivateChannelInviteRefused.id:
-            return PrivateChannelInviteRefused.from_bytes(data)
-        elif packet_id == PublicChannelJoined.id:
-            return PublicChannelJoined.from_bytes(data)
-        elif packet_id == PublicChannelLeft.id:
-            return PublicChannelLeft.from_bytes(data)
-        elif packet_id == PublicChannelMessage.id:
-            return PublicChannelMessage.from_bytes(data)
-        elif packet_id == Pong.id:
-            return Pong.from_bytes(data)
-        else:
-            return None
+    def from_bytes(cls, data):
+        """
+        Create a packet from the raw packet data, without decoding any of its fields yet.
+        """
+
+        packet = cls.__new__(cls)
+        packet.data = bytes(data)
+        return packet
 
 
 class LoginSeed(ServerPacket):
@@ -77,11 +76,6 @@ class LoginSeed(ServerPacket):
         self.seed = seed
         super().__init__(self.id, self.types, [self.seed])
 
-    @classmethod
-    def from_bytes(cls, data):
-        args = decode_args(cls.types, data)
-        return cls(*args)
-
 
 class LoginOK(ServerPacket):
     id = 5
@@ -90,10 +84,6 @@ class LoginOK(ServerPacket):
     def __init__(self):
         super().__init__(self.id, self.types, [])
 
-    @classmethod
-    def from_bytes(cls, data):
-        return cls()
-
 
 class LoginError(ServerPacket):
     id = 6
@@ -103,11 +93,6 @@ class LoginError(ServerPacket):
         self.message = message
         super().__init__(self.id, self.types, [self.message])
 
-    @classmethod
-    def from_bytes(cls, data):
-        args = decode_args(cls.types, data)
-        return cls(*args)
-
 
 class LoginCharacterList(ServerPacket):
     id = 7
@@ -120,11 +105,6 @@ class LoginCharacterList(ServerPacket):
         self.online_statuses = online_statuses
         super().__init__(self.id, self.types, [self.char_ids, self.names, self.levels, self.online_statuses])
 
-    @classmethod
-    def from_bytes(cls, data):
-        args = decode_args(cls.types, data)
-        return cls(*args)
-
 
 class CharacterUnknown(ServerPacket):
     id = 10
@@ -134,11 +114,6 @@ class CharacterUnknown(ServerPacket):
         self.char_id = char_id
         super().__init__(self.id, self.types, [self.char_id])
 
-    @classmethod
-    def from_bytes(cls, data):
-        args = decode_args(cls.types, data)
-        return cls(*args)
-
 
 class CharacterName(ServerPacket):
     id = 20
@@ -149,11 +124,6 @@ class CharacterName(ServerPacket):
         self.name = name
         super().__init__(self.id, self.types, [self.char_id, self.name])
 
-    @classmethod
-    def from_bytes(cls, data):
-        args = decode_args(cls.types, data)
-        return cls(*args)
-
 
 class CharacterLookup(ServerPacket):
     id = 21
@@ -164,11 +134,6 @@ class CharacterLookup(ServerPacket):
         self.name = name
         super().__init__(self.id, self.types, [self.char_id, self.name])
 
-    @classmethod
-    def from_bytes(cls, data):
-        args = decode_args(cls.types, data)
-        return cls(*args)
-
 
 class PrivateMessage(ServerPacket):
     id = 30
@@ -180,11 +145,6 @@ class PrivateMessage(ServerPacket):
         self.blob = blob
         super().__init__(self.id, self.types, [self.char_id, self.message, self.blob])
 
-    @classmethod
-    def from_bytes(cls, data):
-        args = decode_args(cls.types, data)
-        return cls(*args)
-
 
 class VicinityMessage(ServerPacket):
     id = 34
@@ -196,11 +156,6 @@ class VicinityMessage(ServerPacket):
         self.blob = blob
         super().__init__(self.id, self.types, [self.char_id, self.message, self.blob])
 
-    @classmethod
-    def from_bytes(cls, data):
-        args = decode_args(cls.types, data)
-        return cls(*args)
-
 
 class BroadcastMessage(ServerPacket):
     id = 35
@@ -212,11 +167,6 @@ class BroadcastMessage(ServerPacket):
         self.blob = blob
         super().__init__(self.id, self.types, [self.text, self.message, self.blob])
 
-    @classmethod
-    def from_bytes(cls, data):
-        args = decode_args(cls.types, data)
-        return cls(*args)
-
 
 class SimpleSystemMessage(ServerPacket):
     id = 36
@@ -226,11 +176,6 @@ class SimpleSystemMessage(ServerPacket):
         self.message = message
         super().__init__(self.id, self.types, [self.message])
 
-    @classmethod
-    def from_bytes(cls, data):
-        args = decode_args(cls.types, data)
-        return cls(*args)
-
 
 class SystemMessage(ServerPacket):
     id = 37
@@ -243,11 +188,6 @@ class SystemMessage(ServerPacket):
         self.message_args = message_args
         super().__init__(self.id, self.types, [self.client_id, self.window_id, self.message_id, self.message_args])
 
-    @classmethod
-    def from_bytes(cls, data):
-        args = decode_args(cls.types, data)
-        return cls(*args)
-
 
 class BuddyAdded(ServerPacket):
     id = 40
@@ -259,11 +199,6 @@ class BuddyAdded(ServerPacket):
         self.status = status
         super().__init__(self.id, self.types, [self.char_id, self.online, self.status])
 
-    @classmethod
-    def from_bytes(cls, data):
-        args = decode_args(cls.types, data)
-        return cls(*args)
-
 
 class BuddyRemoved(ServerPacket):
     id = 41
@@ -273,11 +208,6 @@ class BuddyRemoved(ServerPacket):
         self.char_id = char_id
         super().__init__(self.id, self.types, [self.char_id])
 
-    @classmethod
-    def from_bytes(cls, data):
-        args = decode_args(cls.types, data)
-        return cls(*args)
-
 
 class PrivateChannelInvited(ServerPacket):
     id = 50
@@ -287,11 +217,6 @@ class PrivateChannelInvited(ServerPacket):
         self.private_channel_id = private_channel_id
         super().__init__(self.id, self.types, [self.private_channel_id])
 
-    @classmethod
-    def from_bytes(cls, data):
-        args = decode_args(cls.types, data)
-        return cls(*args)
-
 
 class PrivateChannelKicked(ServerPacket):
     id = 51
@@ -301,11 +226,6 @@ class PrivateChannelKicked(ServerPacket):
         self.private_channel_id = private_channel_id
         super().__init__(self.id, self.types, [self.private_channel_id])
 
-    @classmethod
-    def from_bytes(cls, data):
-        args = decode_args(cls.types, data)
-        return cls(*args)
-
 
 class PrivateChannelLeft(ServerPacket):
     id = 53
@@ -315,11 +235,6 @@ class PrivateChannelLeft(ServerPacket):
         self.private_channel_id = private_channel_id
         super().__init__(self.id, self.types, [self.private_channel_id])
 
-    @classmethod
-    def from_bytes(cls, data):
-        args = decode_args(cls.types, data)
-        return cls(*args)
-
 
 class PrivateChannelClientJoined(ServerPacket):
     id = 55
@@ -330,11 +245,6 @@ class PrivateChannelClientJoined(ServerPacket):
         self.char_id = char_id
         super().__init__(self.id, self.types, [self.private_channel_id, self.char_id])
 
-    @classmethod
-    def from_bytes(cls, data):
-        args = decode_args(cls.types, data)
-        return cls(*args)
-
 
 class PrivateChannelClientLeft(ServerPacket):
     id = 56
@@ -345,11 +255,6 @@ class PrivateChannelClientLeft(ServerPacket):
         self.char_id = char_id
         super().__init__(self.id, self.types, [self.private_channel_id, self.char_id])
 
-    @classmethod
-    def from_bytes(cls, data):
-        args = decode_args(cls.types, data)
-        return cls(*args)
-
 
 class PrivateChannelMessage(ServerPacket):
     id = 57
@@ -362,11 +267,6 @@ class PrivateChannelMessage(ServerPacket):
         self.blob = blob
         super().__init__(self.id, self.types, [self.private_channel_id, self.char_id, self.message, self.blob])
 
-    @classmethod
-    def from_bytes(cls, data):
-        args = decode_args(cls.types, data)
-        return cls(*args)
-
 
 class PrivateChannelInviteRefused(ServerPacket):
     id = 58
@@ -377,11 +277,6 @@ class PrivateChannelInviteRefused(ServerPacket):
         self.char_id = char_id
         super().__init__(self.id, self.types, [self.private_channel_id, self.char_id])
 
-    @classmethod
-    def from_bytes(cls, data):
-        args = decode_args(cls.types, data)
-        return cls(*args)
-
 
 class PublicChannelJoined(ServerPacket):
     id = 60
@@ -394,11 +289,6 @@ class PublicChannelJoined(ServerPacket):
         self.flags = flags
         super().__init__(self.id, self.types, [self.channel_id, self.name, self.unknown, self.flags])
 
-    @classmethod
-    def from_bytes(cls, data):
-        args = decode_args(cls.types, data)
-        return cls(*args)
-
 
 class PublicChannelLeft(ServerPacket):
     id = 61
@@ -408,11 +298,6 @@ class PublicChannelLeft(ServerPacket):
         self.channel_id = channel_id
         super().__init__(self.id, self.types, [self.channel_id])
 
-    @classmethod
-    def from_bytes(cls, data):
-        args = decode_args(cls.types, data)
-        return cls(*args)
-
 
 class PublicChannelMessage(ServerPacket):
     id = 65
@@ -425,11 +310,6 @@ class PublicChannelMessage(ServerPacket):
         self.blob = blob
         super().__init__(self.id, self.types, [self.channel_id, self.char_id, self.message, self.blob])
 
-    @classmethod
-    def from_bytes(cls, data):
-        args = decode_args(cls.types, data)
-        return cls(*args)
-
 
 class Pong(ServerPacket):
     id = 100
@@ -438,8 +318,3 @@ class Pong(ServerPacket):
     def __init__(self, blob):
         self.blob = blob
         super().__init__(self.id, self.types, [self.blob])
-
-    @classmethod
-    def from_bytes(cls, data):
-        args = decode_args(cls.types, data)
-        return cls(*args)
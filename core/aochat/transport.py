@@ -0,0 +1,144 @@
+import socket
+import struct
+import select
+import time
+
+HEADER = struct.Struct(">2H")
+MAX_FRAME_SIZE = HEADER.size + 0xffff
+
+
+class FrameBuffer:
+    """
+    Preallocated receive buffer that frames are parsed out of without copying.
+
+    Frames are returned as memoryviews into the buffer, so a frame is only valid until the next call to recv_from().
+    """
+
+    def __init__(self, size=2 * MAX_FRAME_SIZE):
+        self.buffer = bytearray(size)
+        self.view = memoryview(self.buffer)
+        self.start = 0
+        self.end = 0
+
+    def next_frame(self):
+        """
+        Returns a tuple of (packet_type, data) for the next complete frame in the buffer, or None.
+        """
+
+        available = self.end - self.start
+        if available < HEADER.size:
+            return None
+
+        packet_type, packet_length = HEADER.unpack_from(self.buffer, self.start)
+        if available < HEADER.size + packet_length:
+            return None
+
+        frame_start = self.start + HEADER.size
+        self.start = frame_start + packet_length
+        return packet_type, self.view[frame_start:self.start]
+
+    def recv_from(self, sock):
+        if self.start == self.end:
+            self.start = self.end = 0
+        elif len(self.buffer) - self.start < MAX_FRAME_SIZE:
+            # move the partial frame to the front so that a frame of any size fits behind it
+            remaining = self.end - self.start
+            self.view[:remaining] = self.view[self.start:self.end]
+            self.start = 0
+            self.end = remaining
+
+        num_bytes = sock.recv_into(self.view[self.end:])
+        if num_bytes == 0:
+            raise EOFError
+
+        self.end += num_bytes
+
+
+class SocketTransport:
+    """
+    Blocking socket transport, waits for data with select().
+    """
+
+    def __init__(self):
+        self.socket = None
+        self.frame_buffer = FrameBuffer()
+        # written to by wakeup() to interrupt a select() from another thread, while connected
+        self.wakeup_reader = None
+        self.wakeup_writer = None
+
+    def connect(self, host, port):
+        self.socket = socket.create_connection((host, port), 10)
+        self.frame_buffer = FrameBuffer()
+        self.wakeup_reader, self.wakeup_writer = socket.socketpair()
+        self.wakeup_reader.setblocking(False)
+        self.wakeup_writer.setblocking(False)
+
+    def disconnect(self):
+        if self.socket:
+            self.socket.shutdown(socket.SHUT_RDWR)
+            self.socket.close()
+            self.socket = None
+
+        if self.wakeup_reader:
+            self.wakeup_reader.close()
+            self.wakeup_writer.close()
+            self.wakeup_reader = None
+            self.wakeup_writer = None
+
+    def read_frame(self, timeout, want_write=False):
+        """
+        Wait up to timeout seconds for a frame from the server. If `want_write` is set, also stop waiting as soon as
+        the socket becomes writable. A call to wakeup() also ends the wait.
+
+        Returns a tuple of (packet_type, data), or None if no complete frame arrived. `data` is a memoryview that is
+        only valid until the next call to read_frame().
+        """
+
+        frame = self.frame_buffer.next_frame()
+        deadline = None if timeout is None else time.time() + timeout
+        while frame is None:
+            read, write, error = select.select([self.socket, self.wakeup_reader], [self.socket] if want_write else [],
+                                               [], timeout)
+            if self.wakeup_reader in read:
+                self.clear_wakeup()
+                if self.socket not in read:
+                    return None
+            elif not read:
+                return None
+
+            self.frame_buffer.recv_from(self.socket)
+            frame = self.frame_buffer.next_frame()
+            if deadline is not None:
+                timeout = max(0, deadline - time.time())
+
+        return frame
+
+    def wakeup(self):
+        """
+        Interrupt a read_frame() that is waiting in another thread.
+        """
+
+        wakeup_writer = self.wakeup_writer
+        if wakeup_writer:
+            try:
+                wakeup_writer.send(b"\x00")
+            except BlockingIOError:
+                # the buffer is full, so the reader will wake up anyway
+                pass
+            except OSError:
+                # the transport was disconnected in the meantime
+                pass
+
+    def clear_wakeup(self):
+        try:
+            while self.wakeup_reader.recv(4096):
+                pass
+        except BlockingIOError:
+            pass
+
+    def is_writable(self):
+        read, write, error = select.select([], [self.socket], [], 0)
+        return bool(write)
+
+    def write_frame(self, packet_type, data):
+        self.socket.sendall(HEADER.pack(packet_type, len(data)) + data)
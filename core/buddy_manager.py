@@ -50,7 +50,7 @@ class BuddyManager:
         char_id = self.character_manager.resolve_char_to_id(char)
         if char_id and char_id != self.bot.char_id:
             if char_id not in self.buddy_list:
-                self.bot.send_packet(client_packets.BuddyAdd(char_id, "\1"))
+                self.bot.queue_packet(client_packets.BuddyAdd(char_id, "\1"))
                 self.buddy_list[char_id] = {"online": None, "types": [_type]}
             else:
                 self.buddy_list[char_id]["types"].append(_type)
@@ -68,7 +68,7 @@ class BuddyManager:
                 if _type in self.buddy_list[char_id]["types"]:
                     self.buddy_list[char_id]["types"].remove(_type)
                 if len(self.buddy_list[char_id]["types"]) == 0:
-                    self.bot.send_packet(client_packets.BuddyRemove(char_id))
+                    self.bot.queue_packet(client_packets.BuddyRemove(char_id))
                 return True
         else:
             return False
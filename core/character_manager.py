@@ -1,31 +1,113 @@
 from core.decorators import instance
 from core.aochat.client_packets import CharacterLookup
 from core.aochat import server_packets
+from core.aochat.delay_queue import DelayQueue
+from tools.cache import LRUCache
+from tools.logger import Logger
+from concurrent.futures import Future
+import time
 
 
 @instance()
 class CharacterManager:
+    """
+    Resolves character names to character ids and back, and saves the names received from the server.
+    """
+
+    TABLE = "player"
+    CACHE_SIZE = 10000
+    LOOKUP_TIMEOUT = 10
+    UNKNOWN_NAME_CACHE_SIZE = 1000
+    UNKNOWN_NAME_TTL = 300
+    UNKNOWN_CHAR_ID = 4294967295
+
     def __init__(self):
-        self.name_to_id = {}
-        self.id_to_name = {}
+        self.logger = Logger("character_manager")
+        self.name_to_id = LRUCache(self.CACHE_SIZE)
+        self.id_to_name = LRUCache(self.CACHE_SIZE)
+        self.unknown_names = LRUCache(self.UNKNOWN_NAME_CACHE_SIZE, self.UNKNOWN_NAME_TTL)
+        # char name -> (future, id of the timeout job)
+        self.pending_lookups = {}
+        # char id -> name, waiting to be written to the database
+        self.pending_saves = {}
 
     def inject(self, registry):
         self.bot = registry.get_instance("mangopie")
+        self.db = registry.get_instance("db")
+        self.job_scheduler = registry.get_instance("job_scheduler")
 
     def pre_start(self):
         self.bot.add_packet_handler(server_packets.CharacterLookup.id, self.update)
         self.bot.add_packet_handler(server_packets.CharacterName.id, self.update)
 
-    def get_char_id(self, char_name):
+    def start(self):
+        self.load_names()
+        self.job_scheduler.recurring_job(self.flush_names_job, self.job_scheduler.FLUSH_INTERVAL)
+
+    def stop(self):
+        self.flush_names()
+
+    def load_names(self):
+        # placeholder rows of PorkManager have a made up name
+        rows = self.db.find_all(self.TABLE, {"source": {"$ne": "stub"}}, {"char_id": 1, "name": 1}) \
+            .sort("last_updated", -1).limit(self.CACHE_SIZE)
+
+        # insert the oldest first, so the most recently updated names are the last to be evicted
+        for row in reversed(list(rows)):
+            if row.get("name"):
+                self.name_to_id.set(row["name"], row["char_id"])
+                self.id_to_name.set(row["char_id"], row["name"])
+
+    def flush_names(self):
+        if self.pending_saves:
+            self.db.bulk_update(self.TABLE,
+                                [({"char_id": char_id}, {"name": name}) for char_id, name in self.pending_saves.items()],
+                                upsert=True,
+                                set_on_insert={"source": "chat_server", "last_updated": int(time.time())})
+            self.pending_saves = {}
+
+    def flush_names_job(self, t):
+        self.flush_names()
+
+    def get_cache_stats(self):
+        return {
+            "name_to_id": self.name_to_id.get_stats(),
+            "id_to_name": self.id_to_name.get_stats()
+        }
+
+    def lookup_char_id(self, char_name):
         char_name = char_name.capitalize()
-        if char_name in self.name_to_id:
-            return self.name_to_id[char_name]
+        future = Future()
+        char_id = self.name_to_id.get(char_name)
+        if char_id is not None:
+            future.set_result(char_id)
+        elif char_name in self.unknown_names:
+            future.set_result(None)
+        elif char_name in self.pending_lookups:
+            future = self.pending_lookups[char_name][0]
         else:
-            self.bot.send_packet(CharacterLookup(char_name))
-            while char_name not in self.name_to_id:
-                self.bot.iterate()
+            job_id = self.job_scheduler.delayed_job(self.lookup_timeout_job, self.LOOKUP_TIMEOUT, char_name)
+            self.pending_lookups[char_name] = (future, job_id)
+            self.bot.queue_packet(CharacterLookup(char_name), priority=DelayQueue.PRIORITY_HIGH)
+        return future
 
-            return self.name_to_id.get(char_name, None)
+    def get_char_id(self, char_name):
+        # blocks until the lookup is resolved, prefer lookup_char_id() in new code
+        future = self.lookup_char_id(char_name)
+        deadline = time.time() + self.LOOKUP_TIMEOUT
+
+        # send the lookup right away, instead of after the first wait for a packet
+        if not future.done():
+            self.bot.iterate(0)
+
+        while not future.done():
+            now = time.time()
+            if now >= deadline:
+                self.lookup_timeout_job(deadline, char_name.capitalize())
+                break
+            self.bot.iterate(min(1, deadline - now))
+
+        return future.result()
 
     def resolve_char_to_id(self, char):
         if isinstance(char, int):
@@ -35,6 +117,18 @@ class CharacterManager:
         else:
             return self.get_char_id(char)
 
+    def lookup_char_to_id(self, char):
+        if isinstance(char, int):
+            char_id = char
+        elif char.isdigit():
+            char_id = int(char)
+        else:
+            return self.lookup_char_id(char)
+
+        future = Future()
+        future.set_result(char_id)
+        return future
+
     def resolve_char_to_name(self, char):
         if isinstance(char, int):
             return self.get_char_name(char)
@@ -42,11 +136,29 @@ class CharacterManager:
             return char
 
     def get_char_name(self, char_id):
-        return self.id_to_name.get(char_id, None)
+        return self.id_to_name.get(char_id)
+
+    def lookup_timeout_job(self, t, char_name):
+        future, job_id = self.pending_lookups.pop(char_name, (None, None))
+        if future:
+            self.job_scheduler.cancel_job(job_id)
+            self.logger.warning("Timed out looking up char id for '%s'" % char_name)
+            future.set_result(None)
 
     def update(self, packet):
-        if packet.char_id == 4294967295:
-            self.name_to_id[packet.name] = None
+        if packet.char_id == self.UNKNOWN_CHAR_ID:
+            self.name_to_id.delete(packet.name)
+            self.unknown_names.set(packet.name, True)
+            char_id = None
         else:
-            self.id_to_name[packet.char_id] = packet.name
-            self.name_to_id[packet.name] = packet.char_id
+            if self.id_to_name.get(packet.char_id) != packet.name:
+                self.pending_saves[packet.char_id] = packet.name
+            self.id_to_name.set(packet.char_id, packet.name)
+            self.name_to_id.set(packet.name, packet.char_id)
+            self.unknown_names.delete(packet.name)
+            char_id = packet.char_id
+
+        future, job_id = self.pending_lookups.pop(packet.name.capitalize(), (None, None))
+        if future:
+            self.job_scheduler.cancel_job(job_id)
+            future.set_result(char_id)
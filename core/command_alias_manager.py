@@ -7,17 +7,18 @@ from tools.logger import Logger
 class CommandAliasManager:
     def __init__(self):
         self.logger = Logger("command_alias_manager")
+        # enabled aliases, kept in sync with the database by add_alias() and remove_alias()
+        self.aliases = {}
 
     def inject(self, registry):
         self.db = registry.get_instance("db")
         self.command_manager: CommandManager = registry.get_instance("command_manager")
 
+    def start(self):
+        self.aliases = {row['alias']: row['command'] for row in self.get_enabled_aliases()}
+
     def check_for_alias(self, command_str):
-        row = self.get_alias(command_str)
-        if row and row['enabled']:
-            return row['command']
-        else:
-            return None
+        return self.aliases.get(command_str, None)
 
     def get_alias(self, alias):
         return self.db.find('command_alias', {'alias': alias})
@@ -29,16 +30,18 @@ class CommandAliasManager:
                 return False
             else:
                 self.db.update('command_alias', {'alias': alias}, {'command': command, 'enabled': 1})
-                return True
         else:
             self.db.insert('command_alias', {'alias': alias, 'command': command, 'enabled': 1})
-            return True
+
+        self.aliases[alias] = command
+        return True
 
     def remove_alias(self, alias):
         row = self.get_alias(alias)
         if row:
             if row['enabled']:
                 self.db.update('command_alias', {'alias': alias}, {'enabled': 0})
+                self.aliases.pop(alias, None)
                 return True
             else:
                 return False
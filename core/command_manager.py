@@ -9,6 +9,7 @@ from core.mangopie import Mangopie
 from tools.chat_blob import ChatBlob
 from tools.map_object import MapObject
 from tools.util import Util
+from tools.command_param_types import Const, Options, Regex
 from __init__ import flatmap, get_attrs
 import collections
 import re
@@ -22,6 +23,8 @@ class CommandManager:
 
     def __init__(self):
         self.handlers = collections.defaultdict(list)
+        # routes by command and channel, built from the enabled command configs in the database on first use
+        self.routes = None
         self.logger = Logger("command_manager")
         self.channels = {}
         self.ignore_regexes = [
@@ -103,6 +106,7 @@ class CommandManager:
         r = re.compile(self.get_regex_from_params(params), re.IGNORECASE)
         self.handlers[command_key].append(
             {"regex": r, "callback": handler, "help": help_text, "description": description, "params": params})
+        self.invalidate_routes()
 
     def handle_private_message(self, packet: server_packets.PrivateMessage):
         # since the command symbol is not required for private messages,
@@ -154,12 +158,11 @@ class CommandManager:
                 command_str, command_args = self.get_command_parts(
                     command_alias + " " + command_args if command_args else command_alias)
 
-            cmd_configs = self.get_command_configs(command_str, channel, 1)
-            cmd_configs = list(cmd_configs)
-            if cmd_configs:
-                # given a list of cmd_configs that are enabled, see if one has regex that matches incoming command_str
-                cmd_config, matches, handler = self.get_matches(cmd_configs, command_args)
-                if matches:
+            route = self.get_route(command_str, channel)
+            if route:
+                # given the route for the enabled cmd_configs, see if one has regex that matches incoming command_str
+                cmd_config, matches, handler = self.get_matches(route, command_args)
+                if handler:
                     if self.access_manager.check_access(char_id, cmd_config['access_level']):
                         sender = MapObject(
                             {"name": self.character_manager.resolve_char_to_name(char_id), "char_id": char_id})
@@ -179,14 +182,29 @@ class CommandManager:
             self.logger.error("error processing command: %s" % message, e)
             reply("There was an error processing your request.")
 
+    def add_done_callback(self, future, reply, callback):
+        """
+        Run callback(future.result()) when `future` is done, for commands that reply once a lookup has finished. Errors
+        in the callback are logged and replied to like errors in the command itself.
+        """
+
+        def run_callback(done_future):
+            try:
+                callback(done_future.result())
+            except Exception as e:
+                self.logger.error("error processing command callback", e)
+                reply("There was an error processing your request.")
+
+        future.add_done_callback(run_callback)
+
     def get_help_text(self, char, command_str, channel):
-        data = self.db.find_all('command_config', {'command': command_str, 'channel': channel, 'enabled': 1})
+        route = self.get_route(command_str, channel)
+        data = route['cmd_configs'] if route else []
         # filter out commands that character does not have access level for
         data = filter(lambda row: self.access_manager.check_access(char, row['access_level']), data)
 
         def read_help_text(row):
-            command_key = self.get_command_key(row['command'], row['sub_command'])
-            return filter(lambda x: x is not None, map(lambda handler: handler["help"], self.handlers[command_key]))
+            return filter(lambda x: x is not None, map(lambda handler: handler["help"], row['handlers']))
 
         content = "\n\n".join(flatmap(read_help_text, data))
         return content if content else None
@@ -223,21 +241,29 @@ class CommandManager:
         else:
             return parts[0], ""
 
-    def get_matches(self, cmd_configs, command_args):
+    def get_matches(self, route, command_args):
+        """
+        Returns the cmd_config and handler of the first handler whose params match `command_args`, and the groups
+        matched by those params.
+        """
+
         if command_args:
             command_args = " " + command_args
 
-        for row in cmd_configs:
-            command_key = self.get_command_key(row['command'], row['sub_command'])
-            handlers = self.handlers[command_key]
-            for handler in handlers:
-                matches = handler["regex"].match(command_args)
-                if matches:
-                    return row, matches, handler
+        # only try the handlers that can match the first word of the args
+        words = command_args.split(None, 1)
+        handlers = route['handlers_by_prefix'].get(words[0].lower(), None) if words else None
+        if handlers is None:
+            handlers = route['handlers']
+
+        for row, handler in handlers:
+            matches = handler["regex"].match(command_args)
+            if matches:
+                return row, matches.groups(), handler
         return None, None, None
 
-    def process_matches(self, matches, params):
-        groups = list(matches.groups())
+    def process_matches(self, groups, params):
+        groups = list(groups)
 
         processed = []
         for param in params:
@@ -260,7 +286,9 @@ class CommandManager:
             return parts[0].lower(), ""
 
     def get_command_configs(self, command, channel=None, enabled=1, sub_command=None):
-        query = {"command": command}
+        query = {}
+        if command:
+            query['command'] = command
         if channel:
             query['channel'] = channel
         if enabled:
@@ -269,6 +297,84 @@ class CommandManager:
             query['sub_command'] = sub_command
         return self.db.find_all('command_config', query)
 
+    def get_route(self, command, channel):
+        """
+        Returns the route for a command on a channel, or None if the command is not enabled on that channel.
+
+        A route has the enabled `cmd_configs` for the command, with the handlers for each. The handlers are also
+        indexed by the literal word their params start with (eg. Const("add")), so that only the handlers that can
+        match the first word of the args are tried.
+        """
+
+        if self.routes is None:
+            self.routes = self.build_routes()
+        return self.routes.get(command, {}).get(channel, None)
+
+    def build_routes(self):
+        cmd_configs = {}
+        for row in self.get_command_configs(None, enabled=1):
+            handlers = self.handlers.get(self.get_command_key(row['command'], row['sub_command']))
+            if handlers:
+                cmd_configs.setdefault((row['command'], row['channel']), []).append({
+                    'command': row['command'],
+                    'sub_command': row['sub_command'],
+                    'access_level': row['access_level'],
+                    'handlers': handlers
+                })
+
+        routes = {}
+        for (command, channel), rows in cmd_configs.items():
+            routes.setdefault(command, {})[channel] = self.build_route(rows)
+        return routes
+
+    def build_route(self, cmd_configs):
+        entries = []
+        for row in cmd_configs:
+            for handler in row['handlers']:
+                entries.append((row, handler, self.get_literal_prefixes(handler['params'])))
+
+        # for each literal first word, the handlers that start with that word or that do not start with a literal
+        handlers_by_prefix = {}
+        for prefix in set().union(*[prefixes for row, handler, prefixes in entries if prefixes]):
+            handlers_by_prefix[prefix] = [(row, handler) for row, handler, prefixes in entries
+                                          if prefixes is None or prefix in prefixes]
+
+        return {
+            'cmd_configs': cmd_configs,
+            'handlers_by_prefix': handlers_by_prefix,
+            'handlers': [(row, handler) for row, handler, prefixes in entries if prefixes is None]
+        }
+
+    def get_literal_prefixes(self, params):
+        """
+        Returns the words that the args for `params` must start with, or None if the args can start with any word.
+        """
+
+        if not params or params[0].is_optional:
+            return None
+
+        # a custom regex could match the rest of the first word
+        if len(params) > 1 and isinstance(params[1], Regex):
+            return None
+
+        if isinstance(params[0], Const):
+            words = [params[0].name]
+        elif isinstance(params[0], Options):
+            words = params[0].options
+        else:
+            return None
+
+        if any(re.escape(word) != word or word.split() != [word] for word in words):
+            return None
+        return set(map(lambda x: x.lower(), words))
+
+    def invalidate_routes(self):
+        """
+        Must be called after command configs are changed in the database.
+        """
+
+        self.routes = None
+
     def get_handlers(self, command_key):
         return self.handlers.get(command_key, None)
 
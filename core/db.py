@@ -1,5 +1,5 @@
 from core.decorators import instance
-from pymongo import MongoClient
+from pymongo import MongoClient, ReplaceOne, UpdateOne
 from pymongo.errors import DuplicateKeyError
 from tools.logger import Logger
 
@@ -35,8 +35,36 @@ class DB:
 
     def find_and_update(self, table, target, update):
         return self.client[table].find_one_and_update(target, {"$set": update})
-    def find_all(self, table, query):
-        return self.client[table].find(query)
+    def find_all(self, table, query, projection=None):
+        return self.client[table].find(query, projection)
+
+    def bulk_upsert(self, table, key, rows):
+        """
+        Insert or replace many rows with a single round trip, matching existing rows on `key`.
+        """
+
+        if not rows:
+            return None
+        return self.client[table].bulk_write([ReplaceOne({key: row[key]}, row, upsert=True) for row in rows],
+                                             ordered=False)
+
+    def bulk_update(self, table, updates, upsert=False, set_on_insert=None):
+        """
+        Apply many (target, update) pairs with a single round trip.
+
+        With `upsert`, targets that do not match a row are inserted, with the fields of `set_on_insert` added.
+        """
+
+        if not updates:
+            return None
+
+        operations = []
+        for target, update in updates:
+            operation = {"$set": update}
+            if set_on_insert:
+                operation["$setOnInsert"] = set_on_insert
+            operations.append(UpdateOne(target, operation, upsert=upsert))
+        return self.client[table].bulk_write(operations, ordered=False)
 
     def delete(self, table, query):
         return self.client[table].delete_one(query)
@@ -2,6 +2,7 @@ from core.decorators import instance
 from core.registry import Registry
 from tools.logger import Logger
 from __init__ import get_attrs
+import heapq
 import time
 
 
@@ -9,13 +10,21 @@ import time
 class EventManager:
     def __init__(self):
         self.handlers = {}
+        # names of the enabled handlers for each event type key, eg. "packet:30"
+        self.enabled_handlers = {}
         self.logger = Logger("event_manager")
         self.event_types = []
-        self.last_timer_event = 0
+
+        # heap of (next_run, event_type_key, handler_name) for enabled timer events. An entry is stale, and skipped,
+        # when its next_run no longer matches `timer_next_runs`
+        self.timer_heap = []
+        self.timer_next_runs = {}
+        self.pending_timer_updates = {}
 
     def inject(self, registry):
         self.db = registry.get_instance("db")
         self.util = registry.get_instance("util")
+        self.job_scheduler = registry.get_instance("job_scheduler")
 
     def pre_start(self):
         self.register_event_type("timer")
@@ -30,6 +39,11 @@ class EventManager:
                     module = self.util.get_module_name(handler)
                     self.register(handler, event_type, description, module)
 
+        self.job_scheduler.recurring_job(self.flush_timer_events_job, self.job_scheduler.FLUSH_INTERVAL)
+
+    def stop(self):
+        self.flush_timer_events()
+
     def register_event_type(self, event_type):
         event_type = event_type.lower()
 
@@ -57,6 +71,8 @@ class EventManager:
             self.logger.warning("No description for event_type '%s' and handler '%s'" % (event_type, handler_name))
 
         row = self.db.find('event_config', {'event_type': event_base_type, 'handler': handler_name})
+        enabled = 1
+        next_run = int(time.time())
 
         if row is None:
             # add new event commands
@@ -68,7 +84,7 @@ class EventManager:
                 'module': module,
                 'verified': 1,
                 'enabled': 1,
-                'next_run': int(time.time())
+                'next_run': next_run
             })
 
         else:
@@ -82,9 +98,38 @@ class EventManager:
                                'description': description,
                                'event_sub_type': event_sub_type,
                            })
+            enabled = row['enabled']
+            next_run = row.get('next_run', next_run)
 
         # load command handler
         self.handlers[handler_name] = handler
+        if enabled:
+            event_type_key = self.get_event_type_key(event_base_type, event_sub_type)
+            self.enabled_handlers.setdefault(event_type_key, []).append(handler_name)
+            if event_base_type == "timer":
+                self.schedule_timer_event(event_type_key, handler_name, next_run)
+
+    def set_event_enabled(self, event_base_type, event_sub_type, handler_name, enabled):
+        """
+        Enables or disables a handler for an event type. Returns False if the handler is not registered for that event
+        type.
+        """
+
+        result = self.db.update('event_config', {'event_type': event_base_type, 'event_sub_type': event_sub_type,
+                                                 'handler': handler_name}, {'enabled': 1 if enabled else 0})
+        if result.matched_count == 0:
+            return False
+
+        event_type_key = self.get_event_type_key(event_base_type, event_sub_type)
+        handler_names = self.enabled_handlers.get(event_type_key, [])
+        if enabled and handler_name not in handler_names:
+            self.enabled_handlers[event_type_key] = handler_names + [handler_name]
+            if event_base_type == "timer":
+                self.schedule_timer_event(event_type_key, handler_name, int(time.time()))
+        elif not enabled and handler_name in handler_names:
+            self.enabled_handlers[event_type_key] = [name for name in handler_names if name != handler_name]
+            self.timer_next_runs.pop((event_type_key, handler_name), None)
+        return True
 
     def fire_event(self, event_type, event_data=None):
         event_base_type, event_sub_type = self.get_event_type_parts(event_type)
@@ -93,23 +138,16 @@ class EventManager:
             self.logger.error("Could not fire event type '%s': event type does not exist" % event_type)
             return
 
-        data = self.db.find_all('event_config', {
-            'event_type': event_base_type,
-            'event_sub_type': event_sub_type,
-            'enabled': 1
-        })
-        for row in data:
-            handler = self.handlers.get(row['handler'], None)
-            if not handler:
-                self.logger.error(
-                    "Could not find handler callback for event type '%s' and handler '%s'" % (event_type, row.handler))
-                return
-
+        for handler_name in self.enabled_handlers.get(self.get_event_type_key(event_base_type, event_sub_type), []):
             try:
-                handler(event_type, event_data)
+                self.handlers[handler_name](event_type, event_data)
             except Exception as e:
                 self.logger.error("error processing event '%s'" % event_type, e)
 
+    def has_event_handlers(self, event_type):
+        event_base_type, event_sub_type = self.get_event_type_parts(event_type)
+        return bool(self.enabled_handlers.get(self.get_event_type_key(event_base_type, event_sub_type)))
+
     def get_event_type_parts(self, event_type):
         parts = event_type.lower().split(":", 1)
         if len(parts) == 2:
@@ -120,36 +158,49 @@ class EventManager:
     def get_event_type_key(self, event_base_type, event_sub_type):
         return event_base_type + ":" + event_sub_type
 
+    def schedule_timer_event(self, event_type_key, handler_name, next_run):
+        self.timer_next_runs[(event_type_key, handler_name)] = next_run
+        heapq.heappush(self.timer_heap, (next_run, event_type_key, handler_name))
+
+    def get_next_timer_event_time(self):
+        while self.timer_heap:
+            next_run, event_type_key, handler_name = self.timer_heap[0]
+            if self.timer_next_runs.get((event_type_key, handler_name)) == next_run:
+                return next_run
+            heapq.heappop(self.timer_heap)
+        return None
+
     def check_for_timer_events(self, timestamp):
-        data = self.db.find('event_config',
-                            {
-                                'enabled': 1,
-                                'event_type': 'timer',
-                                'next_run': {
-                                    '$gte': timestamp
-                                }
-                            })
-
-        if data is not None:
-            for row in data:
-                event_type_key = self.get_event_type_key(row['event_type'], row['event_sub_type'])
-
-                # timer event run times should be consistent, so we base the next run time off the last run time,
-                # instead of the current timestamp
-                next_run = row['next_run'] + int(row['event_sub_type'])
-
-                # prevents timer events from getting too far behind, or having a large "catch-up" after
-                # the bot has been offline for a time
-                if next_run < timestamp:
-                    next_run = timestamp + int(row['event_sub_type'])
-
-                self.db.update('event_config',
-                               {
-                                   'event_type': 'timer',
-                                   'handler': row['handler']
-                               },
-                               {
-                                   'next_run': next_run
-                               })
-
-                self.fire_event(event_type_key)
+        while self.timer_heap and self.timer_heap[0][0] <= timestamp:
+            next_run, event_type_key, handler_name = heapq.heappop(self.timer_heap)
+            if self.timer_next_runs.get((event_type_key, handler_name)) != next_run:
+                continue
+
+            interval = int(event_type_key.split(":", 1)[1])
+
+            # timer event run times should be consistent, so we base the next run time off the last run time,
+            # instead of the current timestamp
+            next_run += interval
+
+            # prevents timer events from getting too far behind, or having a large "catch-up" after
+            # the bot has been offline for a time
+            if next_run < timestamp:
+                next_run = timestamp + interval
+
+            self.schedule_timer_event(event_type_key, handler_name, next_run)
+            self.pending_timer_updates[handler_name] = next_run
+
+            try:
+                self.handlers[handler_name](event_type_key, None)
+            except Exception as e:
+                self.logger.error("error processing event '%s'" % event_type_key, e)
+
+    def flush_timer_events(self):
+        if self.pending_timer_updates:
+            updates = [({'event_type': 'timer', 'handler': handler_name}, {'next_run': next_run})
+                       for handler_name, next_run in self.pending_timer_updates.items()]
+            self.db.bulk_update('event_config', updates)
+            self.pending_timer_updates = {}
+
+    def flush_timer_events_job(self, timestamp):
+        self.flush_timer_events()
@@ -1,57 +1,172 @@
 from core.decorators import instance
+from core.registry import Registry
 from tools.logger import Logger
+import heapq
 import time
+import uuid
+
+
+class Job:
+    __slots__ = ("id", "time", "callback", "args", "kwargs", "cancelled", "key")
+
+    def __init__(self, job_id, scheduled_time, callback, args, kwargs, key=None):
+        self.id = job_id
+        self.time = scheduled_time
+        self.callback = callback
+        self.args = args
+        self.kwargs = kwargs
+        self.cancelled = False
+        # key of the job in the database, for persistent jobs
+        self.key = key
 
 
 @instance()
 class JobScheduler:
+    """
+    Runs callbacks at a scheduled time. Persistent jobs are also saved to the database, so they survive a restart.
+    """
+
+    TABLE = "scheduled_job"
+    # how often pending database writes are flushed, for the managers that batch them
+    FLUSH_INTERVAL = 10
+
     def __init__(self):
-        self.logger = Logger("setting_manager")
+        self.logger = Logger("job_scheduler")
         self.jobs = []
+        self.jobs_by_id = {}
         self.job_id_index = 0
+        self.pending_saves = {}
+        self.pending_deletes = set()
 
     def inject(self, registry):
-        pass
+        self.db = registry.get_instance("db")
 
     def start(self):
-        pass
+        self.load_persistent_jobs()
+        self.recurring_job(self.flush_persistent_jobs_job, self.FLUSH_INTERVAL)
+
+    def stop(self):
+        self.flush_persistent_jobs()
+
+    def __len__(self):
+        return len(self.jobs_by_id)
 
     def check_for_scheduled_jobs(self, timestamp):
-        while self.jobs and self.jobs[0]["time"] <= timestamp:
+        while self.jobs and self.jobs[0][0] <= timestamp:
+            job = heapq.heappop(self.jobs)[2]
+            if job.cancelled:
+                continue
+
+            del self.jobs_by_id[job.id]
+            if job.key:
+                self._delete_persistent_job(job)
+
             try:
-                job = self.jobs.pop(0)
-                job["callback"](job["time"], *job["args"], **job["kwargs"])
+                job.callback(job.time, *job.args, **job.kwargs)
             except Exception as e:
                 self.logger.warning("Error processing scheduled job", e)
 
+    def get_next_job_time(self):
+        while self.jobs and self.jobs[0][2].cancelled:
+            heapq.heappop(self.jobs)
+        return self.jobs[0][0] if self.jobs else None
+
     def delayed_job(self, callback, delay, *args, **kwargs):
-        return self.scheduled_job(callback, int(time.time()) + delay, *args, **kwargs)
+        return self.scheduled_job(callback, time.time() + delay, *args, **kwargs)
 
     def scheduled_job(self, callback, scheduled_time, *args, **kwargs):
         job_id = self._get_next_job_id()
-        new_job = {
-            "id": job_id,
-            "callback": callback,
-            "args": args,
-            "kwargs": kwargs,
-            "time": scheduled_time
-        }
+        self._add_job(Job(job_id, scheduled_time, callback, args, kwargs))
+        return job_id
 
-        self._insert_job(new_job)
+    def recurring_job(self, callback, interval, *args, **kwargs):
+        """
+        Run callback every `interval` seconds, even if it raises. The job id stays the same between runs, so the job
+        can be cancelled with cancel_job().
+        """
+
+        job_id = self._get_next_job_id()
+        self._add_recurring_job(job_id, callback, interval, args, kwargs)
+        return job_id
+
+    def delayed_persistent_job(self, callback, delay, *args, **kwargs):
+        return self.persistent_job(callback, time.time() + delay, *args, **kwargs)
+
+    def persistent_job(self, callback, scheduled_time, *args, **kwargs):
+        instance_name = Registry.get_instance_name(getattr(callback, "__self__", None))
+        if instance_name is None:
+            raise Exception("Callback for persistent job must be a method of a registered instance")
+
+        job_id = self._get_next_job_id()
+        job = Job(job_id, scheduled_time, callback, args, kwargs, uuid.uuid4().hex)
+        self._add_job(job)
+        self.pending_saves[job.key] = {
+            "key": job.key,
+            "instance": instance_name,
+            "method": callback.__name__,
+            "time": scheduled_time,
+            "args": list(args),
+            "kwargs": kwargs
+        }
         return job_id
 
     def cancel_job(self, job_id):
-        for index, job in enumerate(self.jobs):
-            if job["id"] == job_id:
-                return self.jobs.pop(index)
-        return None
-
-    def _insert_job(self, new_job):
-        for index, job in enumerate(self.jobs):
-            if job["time"] > new_job["time"]:
-                self.jobs.insert(index, new_job)
-                return
-        self.jobs.append(new_job)
+        job = self.jobs_by_id.pop(job_id, None)
+        if job is None:
+            return None
+
+        job.cancelled = True
+        if job.key:
+            self._delete_persistent_job(job)
+
+        if len(self.jobs) > 2 * len(self.jobs_by_id):
+            self.jobs = [(it.time, it.id, it) for it in self.jobs_by_id.values()]
+            heapq.heapify(self.jobs)
+        return job
+
+    def load_persistent_jobs(self):
+        for row in self.db.find_all(self.TABLE, {}):
+            inst = Registry.get_instance(row["instance"])
+            callback = getattr(inst, row["method"], None) if inst else None
+            if callback is None:
+                self.logger.warning("Discarding persistent job, could not find handler '%s.%s'" %
+                                    (row["instance"], row["method"]))
+                self.pending_deletes.add(row["key"])
+                continue
+
+            job = Job(self._get_next_job_id(), row["time"], callback, tuple(row["args"]), row["kwargs"], row["key"])
+            self._add_job(job)
+
+    def flush_persistent_jobs(self):
+        if self.pending_saves:
+            self.db.bulk_upsert(self.TABLE, "key", list(self.pending_saves.values()))
+            self.pending_saves = {}
+
+        if self.pending_deletes:
+            self.db.delete_all(self.TABLE, {"key": {"$in": list(self.pending_deletes)}})
+            self.pending_deletes = set()
+
+    def flush_persistent_jobs_job(self, timestamp):
+        self.flush_persistent_jobs()
+
+    def _add_job(self, job):
+        self.jobs_by_id[job.id] = job
+        heapq.heappush(self.jobs, (job.time, job.id, job))
+
+    def _add_recurring_job(self, job_id, callback, interval, args, kwargs):
+        self._add_job(Job(job_id, time.time() + interval, self._run_recurring_job,
+                          (job_id, callback, interval, args, kwargs), {}))
+
+    def _run_recurring_job(self, timestamp, job_id, callback, interval, args, kwargs):
+        try:
+            callback(timestamp, *args, **kwargs)
+        finally:
+            self._add_recurring_job(job_id, callback, interval, args, kwargs)
+
+    def _delete_persistent_job(self, job):
+        # a job that has not been written yet only needs to be dropped from the pending writes
+        if self.pending_saves.pop(job.key, None) is None:
+            self.pending_deletes.add(job.key)
 
     def _get_next_job_id(self):
         self.job_id_index += 1
@@ -1,4 +1,5 @@
 from core.aochat.delay_queue import DelayQueue
+from core.aochat.packet_queue import PacketQueue
 from core.aochat import server_packets, client_packets
 from core.decorators import instance
 from core.aochat.bot import Bot
@@ -11,11 +12,15 @@ from tools.text import Text
 from tools.chat_blob import ChatBlob
 from tools.setting_types import TextSettingType, ColorSettingType, NumberSettingType
 from tools.bot_status import BotStatus
+import collections
 import time
 
 
 @instance()
 class Mangopie(Bot):
+    # longest time to wait for incoming data when nothing else is due, in seconds
+    MAX_WAIT = 10
+
     def __init__(self):
         super().__init__()
         self.ready = False
@@ -25,8 +30,19 @@ class Mangopie(Bot):
         self.superadmin = None
         self.status: BotStatus = BotStatus.SHUTDOWN
         self.dimension = None
-        self.packet_queue = DelayQueue(2, 2.5)
-        self.last_timer_event = 0
+        self.packet_queue = PacketQueue()
+        self.packet_queue.add_lane("chat", 2, 2.5, [client_packets.PrivateMessage,
+                                                    client_packets.PrivateChannelMessage,
+                                                    client_packets.PublicChannelMessage])
+        self.packet_queue.add_lane("control", 0.1, 20, [], default=True)
+        self.write_blocked = False
+        # callbacks from other threads, to be run on the bot thread by iterate()
+        self.pending_calls = collections.deque()
+
+        # packets that are needed for login or are handled by iterate() directly
+        self.core_packet_ids = {server_packets.LoginSeed.id, server_packets.LoginOK.id, server_packets.LoginError.id,
+                                server_packets.LoginCharacterList.id, server_packets.PrivateMessage.id,
+                                server_packets.PublicChannelJoined.id, server_packets.SystemMessage.id}
 
     def inject(self, registry):
         self.db = registry.get_instance("db")
@@ -51,6 +67,7 @@ class Mangopie(Bot):
         self.db.client['player'].create_index("char_id", unique=True,background=True)
         self.db.client['online'].create_index("char_id", unique=True,background=True)
         self.db.client['event_config'].create_index("event_type", background=True)
+        self.db.client['scheduled_job'].create_index("key", unique=True, background=True)
         self.db.client['command_config'].update_many({}, {'$set': {'verified': 0}})
         self.db.client['event_config'].update_many({}, {'$set': {'verified': 0}})
         self.db.client['settings'].update_many({}, {'$set': {'verified': 0}})
@@ -113,15 +130,12 @@ class Mangopie(Bot):
         self.post_start()
 
         while self.status == BotStatus.RUN:
-            timestamp = int(time.time())
-
-            # timer events will execute not more often than once per second
-            if self.last_timer_event < timestamp:
-                self.last_timer_event = timestamp
-                self.job_scheduler.check_for_scheduled_jobs(timestamp)
-                self.event_manager.check_for_timer_events(timestamp)
+            timestamp = time.time()
+            self.event_manager.check_for_timer_events(int(timestamp))
+            self.job_scheduler.check_for_scheduled_jobs(timestamp)
 
-            self.iterate()
+            # wait for incoming data, but wake up in time for the next timer event, job, or outgoing packet
+            self.iterate(self.get_next_timeout())
 
         return self.status
 
@@ -130,8 +144,39 @@ class Mangopie(Bot):
         handlers.append(handler)
         self.packet_handlers[packet_id] = handlers
 
-    def iterate(self):
-        packet = self.read_packet()
+    def has_packet_subscribers(self, packet_id):
+        return packet_id in self.core_packet_ids or \
+            packet_id in self.packet_handlers or \
+            self.event_manager.has_event_handlers("packet:" + str(packet_id))
+
+    def get_next_timeout(self):
+        """
+        Returns the number of seconds until the next timer event, scheduled job, or outgoing packet is due.
+        """
+
+        if self.pending_calls:
+            return 0
+
+        deadline = time.time() + self.MAX_WAIT
+
+        next_timer_event_time = self.event_manager.get_next_timer_event_time()
+        if next_timer_event_time is not None:
+            deadline = min(deadline, next_timer_event_time)
+
+        next_job_time = self.job_scheduler.get_next_job_time()
+        if next_job_time is not None:
+            deadline = min(deadline, next_job_time)
+
+        # while the connection is not writable, wait for it to become writable instead
+        if not self.write_blocked:
+            next_dequeue_time = self.packet_queue.get_next_dequeue_time()
+            if next_dequeue_time is not None:
+                deadline = min(deadline, next_dequeue_time)
+
+        return max(0, deadline - time.time())
+
+    def iterate(self, timeout=1):
+        packet = self.read_packet(max(0, timeout), self.write_blocked)
         if packet:
             if isinstance(packet, server_packets.PrivateMessage):
                 self.handle_private_message(packet)
@@ -142,46 +187,83 @@ class Mangopie(Bot):
                     if packet.name != "Clan (name unknown)":
                         self.org_name = packet.name
             elif isinstance(packet, server_packets.SystemMessage):
-                category_id = 20000
-                instance_id = packet.message_id
-                template = self.mmdb.get_message_string(category_id, instance_id)
-                params = self.mmdb.parse_params(packet.message_args)
-                self.logger.info(template % tuple(params))
+                self.logger.info(self.mmdb.format_message(20000, packet.message_id, packet.message_args))
 
             for handler in self.packet_handlers.get(packet.id, []):
                 handler(packet)
 
             self.event_manager.fire_event("packet:" + str(packet.id), packet)
 
-        # check packet queue for outgoing packets
-        outgoing_packet = self.packet_queue.dequeue()
-        while outgoing_packet:
-            self.send_packet(outgoing_packet)
-            outgoing_packet = self.packet_queue.dequeue()
+        self.run_pending_calls()
+        self.write_blocked = not self.send_queued_packets()
 
         return packet
 
+    def call_soon_threadsafe(self, callback, *args):
+        """
+        Run callback(*args) on the bot thread. Can be called from any thread.
+        """
+
+        self.pending_calls.append((callback, args))
+        self.transport.wakeup()
+
+    def run_pending_calls(self):
+        # only run the calls that are pending now, calls added meanwhile are run on the next iteration
+        for _ in range(len(self.pending_calls)):
+            callback, args = self.pending_calls.popleft()
+            try:
+                callback(*args)
+            except Exception as e:
+                self.logger.error("Error running callback", e)
+
+    def send_queued_packets(self):
+        """
+        Send the queued packets whose rate limit has expired.
+
+        Returns False if packets are ready to be sent but the connection is not writable.
+        """
+
+        while True:
+            next_dequeue_time = self.packet_queue.get_next_dequeue_time()
+            if next_dequeue_time is None or next_dequeue_time > time.time():
+                return True
+
+            if not self.transport.is_writable():
+                return False
+
+            outgoing_packet = self.packet_queue.dequeue()
+            if outgoing_packet:
+                self.send_packet(outgoing_packet)
+
+    def queue_packet(self, packet, destination=None, priority=DelayQueue.PRIORITY_NORMAL):
+        """
+        Queue a packet to be sent to the server, subject to the rate limit for its packet type.
+        """
+
+        self.packet_queue.enqueue(packet, destination, priority)
+
     def send_org_message(self, msg):
         org_channel_id = self.public_channel_manager.org_channel_id
         if org_channel_id is None:
             self.logger.warning("Could not send message to org channel, unknown org id")
         else:
-            for page in self.get_text_pages(msg, self.setting_manager.get("org_channel_max_page_length").get_value()):
+            pages = self.get_text_pages(msg, self.setting_manager.get("org_channel_max_page_length").get_value())
+            priority = self.get_page_priority(pages)
+            for page in pages:
                 packet = client_packets.PublicChannelMessage(org_channel_id, page, "")
-                # self.send_packet(packet)
-                self.packet_queue.enqueue(packet)
+                self.packet_queue.enqueue(packet, org_channel_id, priority)
 
     def send_private_message(self, char, msg):
         char_id = self.character_manager.resolve_char_to_id(char)
         if char_id is None:
             self.logger.warning("Could not send message to %s, could not find char id" % char)
         else:
-            for page in self.get_text_pages(msg,
-                                            self.setting_manager.get("private_message_max_page_length").get_value()):
+            pages = self.get_text_pages(msg, self.setting_manager.get("private_message_max_page_length").get_value())
+            priority = self.get_page_priority(pages)
+            for page in pages:
                 self.logger.log_tell("To", self.character_manager.get_char_name(char_id), page)
                 packet = client_packets.PrivateMessage(char_id, page, "\0")
-                # self.send_packet(packet)
-                self.packet_queue.enqueue(packet)
+                self.packet_queue.enqueue(packet, char_id, priority)
 
     def send_private_channel_message(self, msg, private_channel=None):
         if private_channel is None:
@@ -192,10 +274,11 @@ class Mangopie(Bot):
             self.logger.warning(
                 "Could not send message to private channel %s, could not find private channel" % private_channel)
         else:
-            for page in self.get_text_pages(msg,
-                                            self.setting_manager.get("private_channel_max_page_length").get_value()):
+            pages = self.get_text_pages(msg, self.setting_manager.get("private_channel_max_page_length").get_value())
+            priority = self.get_page_priority(pages)
+            for page in pages:
                 packet = client_packets.PrivateChannelMessage(private_channel_id, page, "\0")
-                self.send_packet(packet)
+                self.packet_queue.enqueue(packet, private_channel_id, priority)
 
     def handle_private_message(self, packet: server_packets.PrivateMessage):
         self.logger.log_tell("From", self.character_manager.get_char_name(packet.char_id), packet.message)
@@ -212,6 +295,13 @@ class Mangopie(Bot):
         else:
             return [self.text.format_message(msg)]
 
+    def get_page_priority(self, pages):
+        # send short replies ahead of multi-page blobs
+        if len(pages) > 1:
+            return DelayQueue.PRIORITY_LOW
+        else:
+            return DelayQueue.PRIORITY_NORMAL
+
     def is_ready(self):
         return self.ready
 
@@ -1,48 +1,192 @@
-from core.aochat import server_packets
 from core.decorators import instance
+from tools.cache import LRUCache
 from tools.logger import Logger
 from tools.map_object import MapObject
 from __init__ import none_to_empty_string
+from concurrent.futures import Future, ThreadPoolExecutor, wait
 import requests
+import requests.adapters
 import time
 
 
 @instance()
 class PorkManager:
+    """
+    Looks up character info on people.anarchy-online.com (PORK) on a thread pool. Character info in the database is
+    returned right away, and refreshed in the background when it is old.
+    """
+
+    BASE_URL = "http://people.anarchy-online.com"
+    MAX_WORKERS = 4
+    TIMEOUT = 10
+    # longest time load_character_infos() waits for missing character info
+    BATCH_TIMEOUT = 10
+
+    # seconds until character info is refreshed, by source
+    MAX_AGE = {
+        "people.anarchy-online.com": 86400,
+        "stub": 3600
+    }
+    DEFAULT_MAX_AGE = 86400
+
+    UNKNOWN_CHARACTER_CACHE_SIZE = 1000
+    UNKNOWN_CHARACTER_TTL = 3600
+
     def __init__(self):
         self.logger = Logger("pork_manager")
+        self.base_url = self.BASE_URL
+        self.max_age = dict(self.MAX_AGE)
+        self.executor = ThreadPoolExecutor(max_workers=self.MAX_WORKERS, thread_name_prefix="pork")
+        self.session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=self.MAX_WORKERS)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        # char name -> (future, request) of the request in progress
+        self.pending_requests = {}
+        self.unknown_characters = LRUCache(self.UNKNOWN_CHARACTER_CACHE_SIZE, self.UNKNOWN_CHARACTER_TTL)
 
     def inject(self, registry):
         self.bot = registry.get_instance("mangopie")
         self.db = registry.get_instance("db")
         self.character_manager = registry.get_instance("character_manager")
 
-    def pre_start(self):
-        self.bot.add_packet_handler(server_packets.CharacterLookup.id, self.update)
-        self.bot.add_packet_handler(server_packets.CharacterName.id, self.update)
-
     def start(self):
         pass
 
+    def stop(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
+        self.session.close()
+
     def get_character_info(self, char):
-        # if we have entry in database and it is less than a day old, use that
-        char_info = self.get_from_database(char)
-        if char_info and char_info['source'] == "chat_server":
-            char_info = None
-        elif char_info and char_info['last_updated'] > (int(time.time()) - 86400):
-            char_info['source'] += " (cache)"
+        char_info, fresh = self.get_cached_character_info(char)
+        if fresh:
+            return char_info
+
+        char_name = self.character_manager.resolve_char_to_name(char)
+        if char_info:
+            self.refresh_character_info(char_name, char_info)
             return char_info
+        elif char_name in self.unknown_characters:
+            return None
+
+        try:
+            new_char_info = self.request_character_info(char_name)
+        except requests.RequestException as e:
+            self.logger.warning("Error requesting character info for '%s'" % char_name, e)
+            return None
+
+        return self.update_character_info(char_name, None, new_char_info)
+
+    def get_character_info_async(self, char):
+        char_info, fresh = self.get_cached_character_info(char)
+        if fresh:
+            future = Future()
+            future.set_result(char_info)
+            return future
 
         char_name = self.character_manager.resolve_char_to_name(char)
-        url = "http://people.anarchy-online.com/character/bio/d/%d/name/%s/bio.xml?data_type=json" % (
-            self.bot.dimension, char_name)
+        future = self.refresh_character_info(char_name, char_info)
+        if char_info:
+            # answer with the old info, the refresh only updates the database
+            future = Future()
+            future.set_result(char_info)
+        return future
+
+    def refresh_character_info(self, char_name, char_info):
+        """
+        Request character info in the background. Returns a future that is resolved with the new character info, or
+        with `char_info` if there is none.
+        """
+
+        if not char_name and char_info and not char_info['source'].startswith("stub"):
+            # the name cache does not know every char id, but the database does. Placeholders have a made up name
+            char_name = char_info['name']
+
+        if char_name in self.pending_requests:
+            return self.pending_requests[char_name][0]
+
+        future = Future()
+        if not char_name or char_name in self.unknown_characters:
+            future.set_result(char_info)
+            return future
+
+        request = self.executor.submit(self.request_character_info, char_name)
+        self.pending_requests[char_name] = (future, request)
+        request.add_done_callback(
+            lambda r: self.bot.call_soon_threadsafe(self.finish_request, char_name, char_info, r))
+        return future
+
+    def finish_request(self, char_name, char_info, request):
+        future = self.take_pending_request(char_name, request)
+        if future:
+            new_char_info = self.get_request_result(char_name, request)
+            if new_char_info:
+                self.save_character_info(new_char_info)
+            future.set_result(new_char_info or char_info)
+
+    def take_pending_request(self, char_name, request):
+        """
+        Returns the future of `request` and removes it from the pending requests, or None if it was already taken.
+        """
+
+        future, pending_request = self.pending_requests.get(char_name, (None, None))
+        if pending_request is not request:
+            return None
+
+        del self.pending_requests[char_name]
+        return future
+
+    def get_request_result(self, char_name, request):
+        if request.cancelled():
+            return None
+        elif request.exception():
+            self.logger.warning("Error requesting character info for '%s'" % char_name, request.exception())
+            return None
+
+        new_char_info = request.result()
+        if new_char_info:
+            self.unknown_characters.delete(char_name)
+        else:
+            self.unknown_characters.set(char_name, True)
+        return new_char_info
+
+    def get_cached_character_info(self, char):
+        """
+        Returns a tuple of (char_info, fresh) for the character info in the database.
+        """
+
+        return self.check_cached_character_info(self.get_from_database(char))
+
+    def check_cached_character_info(self, char_info):
+        if not char_info or char_info['source'] == "chat_server":
+            return None, False
+
+        max_age = self.max_age.get(char_info['source'], self.DEFAULT_MAX_AGE)
+        fresh = char_info['last_updated'] > (int(time.time()) - max_age)
+        char_info['source'] += " (cache)"
+        return char_info, fresh
+
+    def update_character_info(self, char_name, char_info, new_char_info):
+        if new_char_info:
+            self.unknown_characters.delete(char_name)
+            self.save_character_info(new_char_info)
+            return new_char_info
+        else:
+            # return cached info from database, even tho it's old
+            self.unknown_characters.set(char_name, True)
+            return char_info
+
+    def request_character_info(self, char_name):
+        # runs on a worker thread of the executor for async requests, so it must not touch the database
+        url = "%s/character/bio/d/%d/name/%s/bio.xml?data_type=json" % (self.base_url, self.bot.dimension, char_name)
+        r = self.session.get(url, timeout=self.TIMEOUT)
 
-        r = requests.get(url)
         try:
             json = r.json()
         except ValueError as e:
             self.logger.warning("Error marshalling value as json: %s" % r.text, e)
-            json = None
+            return None
+
         if json:
             char_info_json = json[0]
             org_info_json = json[1] if json[1] else {}
@@ -71,11 +215,9 @@ class PorkManager:
                 "source": "people.anarchy-online.com"
             })
 
-            self.save_character_info(char_info)
             return char_info
         else:
-            # return cached info from database, even tho it's old
-            return char_info
+            return None
 
     def get_character_history(self, char):
         pass
@@ -84,75 +226,112 @@ class PorkManager:
         pass
 
     def load_character_info(self, char_id):
-        char_info = self.get_character_info(char_id)
-        if not char_info:
-            char_info = MapObject({
-                "name": "Unknown:" + str(char_id),
-                "char_id": char_id,
-                "first_name": "",
-                "last_name": "",
-                "level": 0,
-                "breed": "",
-                "dimension": 5,
-                "gender": "",
-                "faction": "",
-                "profession": "",
-                "profession_title": "",
-                "ai_rank": "",
-                "ai_level": 0,
-                "pvp_rating": 0,
-                "pvp_title": "",
-                "head_id": 0,
-                "org_id": 0,
-                "org_name": "",
-                "org_rank_name": "",
-                "org_rank_id": 6,
-                "source": "stub"
-            })
-            self.save_character_info(char_info)
+        self.load_character_infos([char_id])
+
+    def load_character_infos(self, char_ids, timeout=None):
+        """
+        Make sure there is character info in the database for each of `char_ids`.
+
+        Old character info is refreshed in the background. Missing character info is requested on up to `MAX_WORKERS`
+        threads at a time, waiting at most `timeout` seconds (`BATCH_TIMEOUT` by default), and saved in one batch.
+        Characters without any info get a placeholder, which is replaced when their request finishes.
+
+        This blocks the bot thread while it waits, so commands should pass a timeout of 0.
+        """
+
+        rows = {row['char_id']: row for row in self.db.find_all('player', {'char_id': {'$in': list(char_ids)}})}
+
+        requests_by_char_id = {}
+        char_infos = []
+        for char_id in set(char_ids):
+            char_info, fresh = self.check_cached_character_info(rows.get(char_id, None))
+            if fresh:
+                continue
+
+            char_name = self.character_manager.resolve_char_to_name(char_id)
+            if char_info:
+                self.refresh_character_info(char_name, char_info)
+            elif char_name and char_name not in self.unknown_characters:
+                # shares the request with any request in progress for the same character
+                self.refresh_character_info(char_name, None)
+                requests_by_char_id[char_id] = (char_name, self.pending_requests[char_name][1])
+            else:
+                char_infos.append(self.get_placeholder_character_info(char_id))
+
+        done, not_done = wait([request for char_name, request in requests_by_char_id.values()],
+                              timeout=self.BATCH_TIMEOUT if timeout is None else timeout)
+        for char_id, (char_name, request) in requests_by_char_id.items():
+            new_char_info = None
+            if request in done:
+                # resolve the request here, so it is saved with the rest of the batch
+                future = self.take_pending_request(char_name, request)
+                new_char_info = self.get_request_result(char_name, request)
+                if future:
+                    future.set_result(new_char_info)
+
+            # requests that are still in progress save their info when they finish
+            char_infos.append(new_char_info or self.get_placeholder_character_info(char_id))
+
+        self.save_character_infos(char_infos)
+
+    def get_placeholder_character_info(self, char_id):
+        return MapObject({
+            "name": "Unknown:" + str(char_id),
+            "char_id": char_id,
+            "first_name": "",
+            "last_name": "",
+            "level": 0,
+            "breed": "",
+            "dimension": 5,
+            "gender": "",
+            "faction": "",
+            "profession": "",
+            "profession_title": "",
+            "ai_rank": "",
+            "ai_level": 0,
+            "pvp_rating": 0,
+            "pvp_title": "",
+            "head_id": 0,
+            "org_id": 0,
+            "org_name": "",
+            "org_rank_name": "",
+            "org_rank_id": 6,
+            "source": "stub"
+        })
 
     def save_character_info(self, char_info):
-        # Remove old data
-        self.db.delete('player', {'char_id': char_info.char_id})
-
-        self.db.insert('player',
-                       {
-                           'char_id': char_info.char_id,
-                           'name': char_info.name,
-                           'first_name': char_info.first_name,
-                           'last_name': char_info.last_name,
-                           'level': char_info.level,
-                           'breed': char_info.breed,
-                           'gender': char_info.gender,
-                           'faction': char_info.faction,
-                           'profession': char_info.profession,
-                           'profession_title ': char_info.profession_title,
-                           'ai_rank': char_info.ai_rank,
-                           'ai_level': char_info.ai_level,
-                           'org_id': char_info.org_id,
-                           'org_name': char_info.org_name,
-                           'org_rank_name': char_info.org_rank_name,
-                           'org_rank_id': char_info.org_rank_id,
-                           'dimension': char_info.dimension,
-                           'head_id': char_info.head_id,
-                           'pvp_rating': char_info.pvp_rating,
-                           'pvp_title': char_info.pvp_title,
-                           'source': char_info.source,
-                           'last_updated': int(time.time())})
+        self.save_character_infos([char_info])
+
+    def save_character_infos(self, char_infos):
+        # replaces any old data of the characters
+        if not char_infos:
+            return
+
+        last_updated = int(time.time())
+        self.db.bulk_upsert('player', 'char_id', [{
+            'char_id': char_info.char_id,
+            'name': char_info.name,
+            'first_name': char_info.first_name,
+            'last_name': char_info.last_name,
+            'level': char_info.level,
+            'breed': char_info.breed,
+            'gender': char_info.gender,
+            'faction': char_info.faction,
+            'profession': char_info.profession,
+            'profession_title ': char_info.profession_title,
+            'ai_rank': char_info.ai_rank,
+            'ai_level': char_info.ai_level,
+            'org_id': char_info.org_id,
+            'org_name': char_info.org_name,
+            'org_rank_name': char_info.org_rank_name,
+            'org_rank_id': char_info.org_rank_id,
+            'dimension': char_info.dimension,
+            'head_id': char_info.head_id,
+            'pvp_rating': char_info.pvp_rating,
+            'pvp_title': char_info.pvp_title,
+            'source': char_info.source,
+            'last_updated': last_updated} for char_info in char_infos])
 
     def get_from_database(self, char):
         char_id = self.character_manager.resolve_char_to_id(char)
         return self.db.find('player', {'char_id': char_id})
-
-    def update(self, packet):
-        character = self.get_from_database(packet.char_id)
-        if character:
-            if character['name'] != packet.name:
-                self.db.update('player', {'char_id': packet.char_id}, {'name': packet.name})
-        else:
-            self.db.insert('player', {
-                'char_id': packet.char_id,
-                'name': packet.name,
-                'source': 'chat_server',
-                'last_updated': int(time.time())
-            })
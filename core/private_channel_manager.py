@@ -42,13 +42,13 @@ class PrivateChannelManager:
             self.event_manager.fire_event(self.LEFT_PRIVATE_CHANNEL_EVENT, packet)
 
     def invite(self, char_id):
-        self.bot.send_packet(client_packets.PrivateChannelInvite(char_id))
+        self.bot.queue_packet(client_packets.PrivateChannelInvite(char_id))
 
     def kick(self, char_id):
-        self.bot.send_packet(client_packets.PrivateChannelKick(char_id))
+        self.bot.queue_packet(client_packets.PrivateChannelKick(char_id))
 
     def kickall(self):
-        self.bot.send_packet(client_packets.PrivateChannelKickAll())
+        self.bot.queue_packet(client_packets.PrivateChannelKickAll())
 
     def in_private_channel(self, char_id):
         return char_id in self.private_channel_chars
@@ -41,6 +41,17 @@ class Registry:
             else:
                 cls._registry[key].start()
 
+    @classmethod
+    def stop_all(cls):
+        # call stop() on instances so they can save their state before the bot exits
+        for key in cls._registry:
+            try:
+                cls._registry[key].stop
+            except AttributeError:
+                pass
+            else:
+                cls._registry[key].stop()
+
     @classmethod
     def get_instance(cls, name):
         return cls._registry.get(name, None)
@@ -49,6 +60,13 @@ class Registry:
     def get_all_instances(cls):
         return cls._registry
 
+    @classmethod
+    def get_instance_name(cls, inst):
+        for name, it in cls._registry.items():
+            if it is inst:
+                return name
+        return None
+
     @classmethod
     def add_instance(cls, name, inst, override=False):
         name = cls.format_name(name)
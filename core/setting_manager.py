@@ -10,6 +10,10 @@ class SettingManager:
     def __init__(self):
         self.logger = Logger("setting_manager")
         self.settings = {}
+        # values of the registered settings, loaded from the database when registered and written through on change
+        self.values = {}
+        # incremented whenever a setting value changes, so that values derived from settings can be cached
+        self.version = 0
 
     def inject(self, registry):
         self.db = registry.get_instance("db")
@@ -47,20 +51,24 @@ class SettingManager:
                                "module": module,
                                "verified": 1
                            })
+            self.values[name] = value
             # verify default value is a valid value, and is formatted appropriately
             setting.set_value(value)
         else:
             self.logger.debug("Updating setting '%s'" % name)
             self.db.update('settings', {"name": name}, {"description": description, "verified": 1, "module": module})
+            self.values[name] = row['value']
+            self.version += 1
 
         self.settings[name] = setting
 
     def get_value(self, name):
-        row = self.db.find('settings', {"name": name})
-        return row['value'] if row else None
+        return self.values.get(name, None)
 
     def set_value(self, name, value):
         self.db.update('settings', {"name": name}, {"value": value})
+        self.values[name] = value
+        self.version += 1
 
     def get(self, name):
         name = name.lower()
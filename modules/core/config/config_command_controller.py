@@ -37,6 +37,7 @@ class ConfigCommandController:
         if cmd_channel != "all":
             query['channel'] = cmd_channel
         count = self.db.update_all('command_config', query, {'enabled': enabled})
+        self.command_manager.invalidate_routes()
 
         if count.matched_count == 0:
             reply("Could not find command <highlight>%s<end> for channel <highlight>%s<end>." % (cmd_name, cmd_channel))
@@ -70,6 +71,7 @@ class ConfigCommandController:
         if cmd_channel != "all":
             query['channel'] = cmd_channel
         count = self.db.update_all('command_config', query, {'access_level': access_level})
+        self.command_manager.invalidate_routes()
         if count.matched_count == 0:
             reply("Could not find command <highlight>%s<end> for channel <highlight>%s<end>." % (cmd_name, cmd_channel))
         else:
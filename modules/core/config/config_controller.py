@@ -147,11 +147,7 @@ class ConfigController:
             reply("Unknown event type <highlight>%s<end>." % event_type)
             return
 
-        count = self.db.update('event_config', {'event_type': event_base_type, 'event_sub_type': event_sub_type,
-                                                'handler': event_handler}, {
-                                   'enabled': enabled
-                               })
-        if count.matched_count == 0:
+        if not self.event_manager.set_event_enabled(event_base_type, event_sub_type, event_handler, enabled):
             reply("Could not find event for type <highlight>%s<end> and handler <highlight>%s<end>." % (
                 event_type, event_handler))
         else:
@@ -93,10 +93,12 @@ class MemberController:
         self.buddy_manager.add_buddy(char_id, self.MEMBER_BUDDY_TYPE)
         if not self.get_member(char_id):
             self.db.insert('members', {'char_id': char_id, 'auto_invite': auto_invite})
+            self.access_manager.clear_cache()
 
     def remove_member(self, char_id):
         self.buddy_manager.remove_buddy(char_id, self.MEMBER_BUDDY_TYPE)
         self.db.delete('members', {'char_id': char_id})
+        self.access_manager.clear_cache()
 
     def update_auto_invite(self, char_id, auto_invite):
         self.db.update('members', {'char_id': char_id}, {'auto_invite': auto_invite})
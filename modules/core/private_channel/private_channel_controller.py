@@ -12,6 +12,7 @@ class PrivateChannelController:
         self.bot = registry.get_instance("mangopie")
         self.private_channel_manager = registry.get_instance("private_channel_manager")
         self.character_manager = registry.get_instance("character_manager")
+        self.command_manager = registry.get_instance("command_manager")
 
     @command(command="join", params=[], access_level="member",
              description="Join the private channel")
@@ -27,7 +28,10 @@ class PrivateChannelController:
              description="Invite a character to the private channel")
     def invite_cmd(self, channel, sender, reply, args):
         char = args[0].capitalize()
-        char_id = self.character_manager.resolve_char_to_id(char)
+        self.command_manager.add_done_callback(self.character_manager.lookup_char_to_id(char), reply,
+                                               lambda char_id: self.send_invite(sender, char, char_id, reply))
+
+    def send_invite(self, sender, char, char_id, reply):
         if sender.char_id == char_id:
             self.private_channel_manager.invite(sender.char_id)
         elif char_id:
@@ -1,6 +1,7 @@
 from core.decorators import instance, command
 from tools.command_param_types import Any
 from core.command_manager import CommandManager
+from tools.chat_blob import ChatBlob
 
 
 @instance()
@@ -53,3 +54,16 @@ class SystemController:
         commands = args[0].split("|")
         for command_str in commands:
             self.command_manager.process_command(command_str, channel, sender.char_id, reply)
+
+    @command(command="queue", params=[], access_level="superadmin",
+             description="Show statistics for the outgoing packet queue")
+    def queue_cmd(self, channel, sender, reply, args):
+        blob = ""
+        for lane, stats in self.bot.packet_queue.get_stats().items():
+            blob += "<header2>%s<end>\n" % lane.capitalize()
+            blob += "Queued: <highlight>%d<end>\n" % stats["depth"]
+            blob += "Sent: <highlight>%d<end>\n" % stats["dequeued"]
+            blob += "Average wait: <highlight>%.2f secs<end>\n" % stats["average_wait"]
+            blob += "Max wait: <highlight>%.2f secs<end>\n\n" % stats["max_wait"]
+
+        reply(ChatBlob("Packet Queue (%d)" % len(self.bot.packet_queue), blob))
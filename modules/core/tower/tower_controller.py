@@ -1,7 +1,6 @@
 from core.decorators import instance
 from tools.logger import Logger
 from core.aochat import server_packets
-from core.aochat.extended_message import ExtendedMessage
 import os
 
 
@@ -35,11 +34,7 @@ class TowerController:
             msg = packet.message
             if msg.startswith("~&") and msg.endswith("~"):
                 msg = msg[1:-2]
-                category_id = self.mmdb.read_base_85(msg[0:5])
-                instance_id = self.mmdb.read_base_85(msg[5: 10])
-                template = self.mmdb.get_message_string(category_id, instance_id)
-                params = self.mmdb.parse_params(msg[10:])
-                extended_message = ExtendedMessage(category_id, instance_id, template, params)
+                extended_message = self.mmdb.parse_extended_message(msg)
                 print(extended_message)
                 print(extended_message.get_message())
                 self.event_manager.fire_event("tower_attack", extended_message)
@@ -15,13 +15,25 @@ class CharacterInfoController:
         self.text: Text = registry.get_instance("text")
         self.pork_manager = registry.get_instance("pork_manager")
         self.character_manager = registry.get_instance("character_manager")
+        self.command_manager = registry.get_instance("command_manager")
 
     @command(command="whois", params=[Any("character")], access_level="all",
              description="Get whois information for a character")
     def whois_cmd(self, channel, sender, reply, args):
         char_name = args[1].capitalize()
-        char_info = self.pork_manager.get_character_info(char_name)
-        char_id = self.character_manager.resolve_char_to_id(char_name)
+        self.command_manager.add_done_callback(self.character_manager.lookup_char_to_id(char_name), reply,
+                                               lambda char_id: self.lookup_character_info(char_name, char_id, reply))
+
+    def lookup_character_info(self, char_name, char_id, reply):
+        if not char_id:
+            reply("Could not find info for character <highlight>%s<end>." % char_name)
+            return
+
+        # look up by id, so the name does not have to be resolved again
+        self.command_manager.add_done_callback(self.pork_manager.get_character_info_async(char_id), reply,
+                                               lambda char_info: self.send_whois(char_name, char_id, char_info, reply))
+
+    def send_whois(self, char_name, char_id, char_info, reply):
         if char_info:
             blob = "Name: %s\n" % self.get_full_name(char_info)
             blob += "Profession: %s\n" % char_info['profession']
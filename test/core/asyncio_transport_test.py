@@ -0,0 +1,58 @@
+from core.aochat.asyncio_transport import AsyncioTransport
+import socket
+import struct
+import threading
+import time
+import unittest
+
+
+class AsyncioTransportTest(unittest.TestCase):
+
+    def setUp(self):
+        server = socket.create_server(("127.0.0.1", 0))
+        self.addCleanup(server.close)
+
+        self.transport = AsyncioTransport()
+        self.transport.connect("127.0.0.1", server.getsockname()[1])
+        self.addCleanup(self.transport.disconnect)
+
+        self.server_socket, _ = server.accept()
+        self.addCleanup(self.server_socket.close)
+
+    def test_read_frame(self):
+        self.server_socket.sendall(struct.pack(">2H", 1, 3) + b"one" + struct.pack(">2H", 2, 0))
+
+        self.assertEqual((1, b"one"), self.transport.read_frame(1))
+        self.assertEqual((2, b""), self.transport.read_frame(1))
+        self.assertIsNone(self.transport.read_frame(0.01))
+
+    def test_partial_frame_is_resumed(self):
+        data = struct.pack(">2H", 7, 4) + b"data"
+        self.server_socket.sendall(data[:6])
+        self.assertIsNone(self.transport.read_frame(0.05))
+
+        # the bytes already read are not lost when the wait times out
+        self.server_socket.sendall(data[6:])
+        self.assertEqual((7, b"data"), self.transport.read_frame(1))
+
+    def test_wakeup(self):
+        threading.Timer(0.05, self.transport.wakeup).start()
+
+        start = time.time()
+        self.assertIsNone(self.transport.read_frame(5))
+        self.assertLess(time.time() - start, 1)
+
+        # the wakeup is cleared, and frames are still read after it
+        self.assertIsNone(self.transport.read_frame(0.01))
+        self.server_socket.sendall(struct.pack(">2H", 1, 3) + b"one")
+        self.assertEqual((1, b"one"), self.transport.read_frame(1))
+
+    def test_write_frame(self):
+        self.assertTrue(self.transport.is_writable())
+        self.transport.write_frame(3, b"three")
+        self.assertEqual(struct.pack(">2H", 3, 5) + b"three", self.server_socket.recv(100))
+
+    def test_eof(self):
+        self.server_socket.sendall(struct.pack(">2H", 1, 3) + b"o")
+        self.server_socket.close()
+        self.assertRaises(EOFError, self.transport.read_frame, 1)
@@ -0,0 +1,32 @@
+from tools.cache import LRUCache
+import unittest
+from unittest.mock import patch
+
+
+class LRUCacheTest(unittest.TestCase):
+
+    def test_eviction(self):
+        cache = LRUCache(2)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        self.assertEqual(cache.get("a"), 1)
+
+        # "b" is the least recently used entry
+        cache.set("c", 3)
+        self.assertEqual(cache.get("b"), None)
+        self.assertEqual(cache.get("a"), 1)
+        self.assertEqual(cache.get("c"), 3)
+        self.assertEqual(cache.get_stats(), {"size": 2, "max_size": 2, "hits": 3, "misses": 1})
+
+    @patch("time.time")
+    def test_ttl(self, time_mock):
+        time_mock.return_value = 1000
+        cache = LRUCache(10, 60)
+        cache.set("a", 1)
+
+        time_mock.return_value = 1059
+        self.assertTrue("a" in cache)
+
+        time_mock.return_value = 1060
+        self.assertFalse("a" in cache)
+        self.assertEqual(len(cache), 0)
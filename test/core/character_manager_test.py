@@ -0,0 +1,94 @@
+from core.aochat import server_packets
+from core.character_manager import CharacterManager
+from core.job_scheduler import JobScheduler
+import time
+import unittest
+from unittest.mock import Mock
+
+
+class CharacterManagerTest(unittest.TestCase):
+
+    def create_character_manager(self):
+        character_manager = CharacterManager()
+        character_manager.bot = Mock()
+        character_manager.db = Mock()
+        character_manager.job_scheduler = JobScheduler()
+        return character_manager
+
+    def test_lookup_char_id(self):
+        character_manager = self.create_character_manager()
+
+        future1 = character_manager.lookup_char_id("tester")
+        future2 = character_manager.lookup_char_id("Tester")
+        self.assertIs(future1, future2)
+        self.assertFalse(future1.done())
+        self.assertEqual(1, character_manager.bot.queue_packet.call_count)
+
+        results = []
+        future1.add_done_callback(lambda future: results.append(future.result()))
+        character_manager.update(server_packets.CharacterLookup(123, "Tester"))
+        self.assertEqual([123], results)
+        self.assertEqual(0, len(character_manager.job_scheduler))
+
+        self.assertEqual(123, character_manager.lookup_char_id("tester").result())
+        self.assertEqual(123, character_manager.get_char_id("Tester"))
+        self.assertEqual(1, character_manager.bot.queue_packet.call_count)
+
+    def test_get_char_id_sends_lookup_first(self):
+        character_manager = self.create_character_manager()
+        character_manager.bot.iterate.side_effect = \
+            lambda timeout: character_manager.update(server_packets.CharacterLookup(123, "Tester"))
+
+        # the queued lookup is sent before waiting for the answer
+        self.assertEqual(123, character_manager.get_char_id("Tester"))
+        character_manager.bot.iterate.assert_called_once_with(0)
+
+    def test_unknown_name(self):
+        character_manager = self.create_character_manager()
+
+        future = character_manager.lookup_char_id("Unknown")
+        character_manager.update(server_packets.CharacterLookup(CharacterManager.UNKNOWN_CHAR_ID, "Unknown"))
+        self.assertIsNone(future.result())
+
+        # unknown names are not looked up again until they expire
+        self.assertIsNone(character_manager.lookup_char_id("Unknown").result())
+        self.assertEqual(1, character_manager.bot.queue_packet.call_count)
+
+    def test_lookup_timeout(self):
+        character_manager = self.create_character_manager()
+
+        future = character_manager.lookup_char_id("Tester")
+        character_manager.job_scheduler.check_for_scheduled_jobs(time.time() + CharacterManager.LOOKUP_TIMEOUT)
+        self.assertIsNone(future.result())
+
+        # a timeout is not remembered, the next lookup asks the server again
+        self.assertFalse(character_manager.lookup_char_id("Tester").done())
+        self.assertEqual(2, character_manager.bot.queue_packet.call_count)
+
+    def test_load_and_flush_names(self):
+        character_manager = self.create_character_manager()
+        character_manager.db.find_all.return_value.sort.return_value.limit.return_value = [
+            {"char_id": 2, "name": "Newer"},
+            {"char_id": 1, "name": "Older"}
+        ]
+        character_manager.start()
+
+        # placeholder rows with a made up name are not loaded
+        query = character_manager.db.find_all.call_args[0][1]
+        self.assertEqual({"source": {"$ne": "stub"}}, query)
+
+        self.assertEqual(1, character_manager.get_char_id("older"))
+        self.assertEqual("Newer", character_manager.get_char_name(2))
+        character_manager.bot.queue_packet.assert_not_called()
+        self.assertEqual(1, character_manager.get_cache_stats()["name_to_id"]["hits"])
+
+        # only names that are new or changed are written back, in one batch
+        character_manager.update(server_packets.CharacterLookup(1, "Older"))
+        character_manager.update(server_packets.CharacterName(2, "Renamed"))
+        character_manager.update(server_packets.CharacterLookup(3, "Third"))
+        character_manager.db.bulk_update.assert_not_called()
+
+        character_manager.stop()
+        updates = character_manager.db.bulk_update.call_args[0][1]
+        self.assertEqual([({"char_id": 2}, {"name": "Renamed"}), ({"char_id": 3}, {"name": "Third"})], updates)
+        self.assertEqual({}, character_manager.pending_saves)
@@ -0,0 +1,70 @@
+from core.command_manager import CommandManager
+from core.command_alias_manager import CommandAliasManager
+from tools.command_param_types import Const, Any
+from concurrent.futures import Future
+import unittest
+from unittest.mock import Mock
+
+
+class CommandManagerTest(unittest.TestCase):
+
+    def setUp(self):
+        self.command_manager = CommandManager()
+        self.command_manager.db = Mock()
+        self.command_manager.db.find.return_value = None
+        self.command_manager.access_manager = Mock()
+        self.command_manager.character_manager = Mock()
+        self.command_manager.command_alias_manager = CommandAliasManager()
+        self.command_manager.command_alias_manager.db = Mock()
+        self.command_manager.command_alias_manager.db.find.return_value = None
+        self.command_manager.register_command_channel("Private Message", "msg")
+
+        self.calls = []
+        self.command_manager.register(lambda *args: self.calls.append(("list", args[3])), "timer", [],
+                                      "all", "List timers", "test")
+        self.command_manager.register(lambda *args: self.calls.append(("show", args[3])), "timer", [Any("name")],
+                                      "all", "Show a timer", "test")
+        self.command_manager.register(lambda *args: self.calls.append(("add", args[3])), "timer",
+                                      [Const("add"), Any("name")], "all", "Add a timer", "test", sub_command="add")
+
+        self.command_manager.db.find_all.return_value = [
+            {'command': 'timer', 'sub_command': 'add', 'channel': 'msg', 'access_level': 'all', 'enabled': 1},
+            {'command': 'timer', 'sub_command': '', 'channel': 'msg', 'access_level': 'all', 'enabled': 1}
+        ]
+
+    def test_routes(self):
+        replies = []
+        self.command_manager.process_command("timer add raid", "msg", 1, replies.append)
+        self.command_manager.process_command("timer raid", "msg", 1, replies.append)
+        self.command_manager.process_command("timer", "msg", 1, replies.append)
+        self.command_manager.process_command("unknown", "msg", 1, replies.append)
+
+        self.assertEqual(self.calls, [("add", ["add", "raid"]), ("show", ["raid"]), ("list", [])])
+        self.assertEqual(replies, ["Error! Unknown command."])
+
+        # the routing table is only read from the database once
+        self.assertEqual(self.command_manager.db.find_all.call_count, 1)
+
+        self.command_manager.invalidate_routes()
+        self.command_manager.db.find_all.return_value = []
+        self.command_manager.process_command("timer raid", "msg", 1, replies.append)
+        self.assertEqual(replies, ["Error! Unknown command.", "Error! Unknown command."])
+
+    def test_alias(self):
+        self.command_manager.command_alias_manager.add_alias("ta", "timer add")
+        self.command_manager.process_command("ta raid", "msg", 1, lambda msg: None)
+        self.assertEqual(self.calls, [("add", ["add", "raid"])])
+
+    def test_add_done_callback(self):
+        replies = []
+        results = []
+        future = Future()
+        self.command_manager.add_done_callback(future, replies.append, results.append)
+        future.set_result(123)
+        self.assertEqual([123], results)
+
+        # errors in the callback are replied to, instead of being swallowed by the future
+        future = Future()
+        self.command_manager.add_done_callback(future, replies.append, lambda result: 1 / 0)
+        future.set_result(123)
+        self.assertEqual(["There was an error processing your request."], replies)
@@ -0,0 +1,82 @@
+from core.aochat.delay_queue import DelayQueue
+from core.aochat.packet_queue import PacketQueue
+from core.aochat import client_packets
+import unittest
+from unittest.mock import patch
+
+
+class DelayQueueTest(unittest.TestCase):
+
+    @patch("time.time")
+    def test_burst(self, time_mock):
+        time_mock.return_value = 1000
+        queue = DelayQueue(2, 2.5)
+        for i in range(5):
+            queue.enqueue(i)
+
+        self.assertEqual([queue.dequeue() for i in range(4)], [0, 1, 2, None])
+
+        time_mock.return_value = 1001
+        self.assertEqual(queue.dequeue(), 3)
+        self.assertEqual(queue.dequeue(), None)
+
+        time_mock.return_value = 1003
+        self.assertEqual(queue.dequeue(), 4)
+        self.assertEqual(len(queue), 0)
+
+    @patch("time.time")
+    def test_next_dequeue_time(self, time_mock):
+        time_mock.return_value = 1000
+        queue = DelayQueue(2)
+        self.assertEqual(queue.get_next_dequeue_time(), None)
+
+        queue.enqueue(1)
+        queue.enqueue(2)
+        self.assertEqual(queue.get_next_dequeue_time(), 1000)
+        self.assertEqual(queue.dequeue(), 1)
+        self.assertEqual(queue.get_next_dequeue_time(), 1002)
+
+        time_mock.return_value = 1001
+        self.assertEqual(queue.get_next_dequeue_time(), 1002)
+
+    @patch("time.time")
+    def test_round_robin(self, time_mock):
+        time_mock.return_value = 1000
+        queue = DelayQueue(0)
+        for page in ["a1", "a2", "a3"]:
+            queue.enqueue(page, "a")
+        queue.enqueue("b1", "b")
+        queue.enqueue("c1", "c")
+        queue.enqueue("a4", "a")
+
+        self.assertEqual([queue.dequeue() for i in range(7)], ["a1", "b1", "c1", "a2", "a3", "a4", None])
+
+    @patch("time.time")
+    def test_priority(self, time_mock):
+        time_mock.return_value = 1000
+        queue = DelayQueue(0)
+        queue.enqueue("page1", "a", DelayQueue.PRIORITY_LOW)
+        queue.enqueue("page2", "a", DelayQueue.PRIORITY_LOW)
+        queue.enqueue("reply", "b")
+        queue.enqueue("urgent", "c", DelayQueue.PRIORITY_HIGH)
+
+        self.assertEqual([queue.dequeue() for i in range(4)], ["urgent", "reply", "page1", "page2"])
+
+    @patch("time.time")
+    def test_packet_queue_lanes(self, time_mock):
+        time_mock.return_value = 1000
+        queue = PacketQueue()
+        queue.add_lane("chat", 2, 0, [client_packets.PrivateMessage])
+        queue.add_lane("control", 0, 0, [], default=True)
+        queue.enqueue(client_packets.PrivateMessage(1, "first", ""))
+        queue.enqueue(client_packets.PrivateMessage(1, "second", ""))
+        for char_id in range(3):
+            queue.enqueue(client_packets.BuddyAdd(char_id, "\1"))
+
+        # the rate limited chat lane does not hold up the control lane
+        packets = [queue.dequeue() for i in range(4)]
+        self.assertEqual([packet.id for packet in packets], [30, 40, 40, 40])
+        self.assertIsNone(queue.dequeue())
+        self.assertEqual(len(queue), 1)
+        self.assertEqual(queue.get_stats()["chat"]["depth"], 1)
+        self.assertEqual(queue.get_stats()["control"]["dequeued"], 3)
@@ -0,0 +1,67 @@
+from core.event_manager import EventManager
+from tools.util import Util
+import unittest
+from unittest.mock import Mock
+
+
+class EventManagerTest(unittest.TestCase):
+
+    def test_fire_event(self):
+        event_manager = EventManager()
+        event_manager.db = Mock()
+        event_manager.db.find.return_value = None
+        event_manager.util = Util()
+        event_manager.register_event_type("packet")
+
+        events = []
+
+        def handle_packet(event_type, event_data):
+            events.append(event_data)
+
+        event_manager.register(handle_packet, "packet:30", "Handles packet 30", "test")
+        self.assertTrue(event_manager.has_event_handlers("packet:30"))
+        self.assertFalse(event_manager.has_event_handlers("packet:31"))
+
+        event_manager.fire_event("packet:30", 1)
+        event_manager.fire_event("packet:31", 2)
+        self.assertEqual(events, [1])
+
+        handler_name = event_manager.util.get_handler_name(handle_packet).lower()
+        self.assertTrue(event_manager.set_event_enabled("packet", "30", handler_name, False))
+        self.assertFalse(event_manager.has_event_handlers("packet:30"))
+        event_manager.fire_event("packet:30", 3)
+        self.assertEqual(events, [1])
+
+        self.assertTrue(event_manager.set_event_enabled("packet", "30", handler_name, True))
+        event_manager.fire_event("packet:30", 4)
+        self.assertEqual(events, [1, 4])
+
+        # no database queries are needed to fire events
+        event_manager.db.find_all.assert_not_called()
+
+    def test_timer_events(self):
+        event_manager = EventManager()
+        event_manager.db = Mock()
+        event_manager.db.find.return_value = {'enabled': 1, 'next_run': 1000}
+        event_manager.util = Util()
+        event_manager.register_event_type("timer")
+
+        runs = []
+        event_manager.register(lambda event_type, event_data: runs.append(event_type), "timer:60", "Every minute", "test")
+        self.assertEqual(event_manager.get_next_timer_event_time(), 1000)
+
+        event_manager.check_for_timer_events(999)
+        self.assertEqual(runs, [])
+
+        event_manager.check_for_timer_events(1000)
+        self.assertEqual(runs, ["timer:60"])
+        self.assertEqual(event_manager.get_next_timer_event_time(), 1060)
+
+        # after a long pause the timer does not catch up on missed runs
+        event_manager.check_for_timer_events(5000)
+        self.assertEqual(runs, ["timer:60", "timer:60"])
+        self.assertEqual(event_manager.get_next_timer_event_time(), 5060)
+
+        event_manager.flush_timer_events()
+        updates = event_manager.db.bulk_update.call_args[0][1]
+        self.assertEqual([update for target, update in updates], [{'next_run': 5060}])
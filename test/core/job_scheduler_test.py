@@ -0,0 +1,95 @@
+from core.job_scheduler import JobScheduler
+from core.registry import Registry
+import unittest
+from unittest.mock import Mock, patch
+
+
+class JobSchedulerTest(unittest.TestCase):
+
+    def test_run_in_order(self):
+        scheduler = JobScheduler()
+        results = []
+        scheduler.scheduled_job(lambda t, name: results.append(name), 1002.5, "c")
+        scheduler.scheduled_job(lambda t, name: results.append(name), 1001, "a")
+        scheduler.scheduled_job(lambda t, name: results.append(name), 1001, "b")
+
+        self.assertEqual(scheduler.get_next_job_time(), 1001)
+        scheduler.check_for_scheduled_jobs(1002)
+        self.assertEqual(results, ["a", "b"])
+        self.assertEqual(scheduler.get_next_job_time(), 1002.5)
+
+    def test_cancel(self):
+        scheduler = JobScheduler()
+        results = []
+        job_ids = [scheduler.scheduled_job(lambda t: results.append(t), 1000 + i) for i in range(10)]
+        for job_id in job_ids[:8]:
+            self.assertEqual(scheduler.cancel_job(job_id).id, job_id)
+        self.assertEqual(scheduler.cancel_job(job_ids[0]), None)
+
+        self.assertEqual(len(scheduler), 2)
+        self.assertEqual(scheduler.get_next_job_time(), 1008)
+        scheduler.check_for_scheduled_jobs(2000)
+        self.assertEqual(results, [1008, 1009])
+        self.assertEqual(scheduler.get_next_job_time(), None)
+
+    @patch("time.time")
+    def test_recurring_job(self, time_mock):
+        time_mock.return_value = 1000
+        scheduler = JobScheduler()
+        results = []
+
+        def callback(t, name):
+            results.append((t, name))
+            raise Exception("error")
+
+        job_id = scheduler.recurring_job(callback, 10, "a")
+        scheduler.check_for_scheduled_jobs(1005)
+        self.assertEqual([], results)
+
+        # the job is scheduled again after it ran, even though it raised
+        time_mock.return_value = 1010
+        scheduler.check_for_scheduled_jobs(1010)
+        self.assertEqual([(1010, "a")], results)
+        self.assertEqual(1020, scheduler.get_next_job_time())
+
+        scheduler.cancel_job(job_id)
+        scheduler.check_for_scheduled_jobs(2000)
+        self.assertEqual(1, len(results))
+        self.assertEqual(0, len(scheduler))
+
+    def test_persistent_jobs(self):
+        class Handler:
+            def __init__(self):
+                self.results = []
+
+            def handle(self, t, name):
+                self.results.append(name)
+
+        handler = Handler()
+        Registry.add_instance("job_scheduler_test_handler", handler, override=True)
+
+        scheduler = JobScheduler()
+        scheduler.db = Mock()
+        scheduler.persistent_job(handler.handle, 1001, "a")
+        job_id = scheduler.persistent_job(handler.handle, 1002, "b")
+        scheduler.flush_persistent_jobs()
+
+        rows = scheduler.db.bulk_upsert.call_args[0][2]
+        self.assertEqual([(row["method"], row["args"]) for row in rows], [("handle", ["a"]), ("handle", ["b"])])
+        self.assertEqual(rows[0]["instance"], "job_scheduler_test_handler")
+
+        # jobs are deleted when they are cancelled or have run
+        scheduler.cancel_job(job_id)
+        scheduler.check_for_scheduled_jobs(1001)
+        scheduler.flush_persistent_jobs()
+        deleted = scheduler.db.delete_all.call_args[0][1]["key"]["$in"]
+        self.assertEqual(sorted(deleted), sorted(row["key"] for row in rows))
+        self.assertEqual(handler.results, ["a"])
+
+        # reload the saved jobs into a new scheduler
+        restarted = JobScheduler()
+        restarted.db = Mock()
+        restarted.db.find_all.return_value = rows
+        restarted.load_persistent_jobs()
+        restarted.check_for_scheduled_jobs(2000)
+        self.assertEqual(handler.results, ["a", "a", "b"])
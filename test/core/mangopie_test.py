@@ -0,0 +1,83 @@
+from core.aochat import client_packets
+from core.mangopie import Mangopie
+import unittest
+from unittest.mock import Mock, patch
+
+
+class MangopieTest(unittest.TestCase):
+
+    def create_bot(self):
+        bot = Mangopie()
+        bot.transport = Mock()
+        bot.transport.read_frame.return_value = None
+        bot.event_manager = Mock()
+        bot.event_manager.get_next_timer_event_time.return_value = None
+        bot.job_scheduler = Mock()
+        bot.job_scheduler.get_next_job_time.return_value = None
+        return bot
+
+    @patch("time.time")
+    def test_get_next_timeout(self, time_mock):
+        time_mock.return_value = 1000
+        bot = self.create_bot()
+        self.assertEqual(Mangopie.MAX_WAIT, bot.get_next_timeout())
+
+        bot.job_scheduler.get_next_job_time.return_value = 1003
+        self.assertEqual(3, bot.get_next_timeout())
+
+        bot.event_manager.get_next_timer_event_time.return_value = 1002
+        self.assertEqual(2, bot.get_next_timeout())
+
+        # the chat lane lets 3 messages through at once, the next one 1 second later
+        for i in range(4):
+            bot.queue_packet(client_packets.PrivateMessage(i, "message", "\0"))
+        self.assertEqual(0, bot.get_next_timeout())
+        bot.send_queued_packets()
+        self.assertEqual(1, bot.get_next_timeout())
+
+        # while the connection is not writable, outgoing packets are not waited for
+        bot.write_blocked = True
+        self.assertEqual(2, bot.get_next_timeout())
+
+        bot.call_soon_threadsafe(print)
+        self.assertEqual(0, bot.get_next_timeout())
+        bot.transport.wakeup.assert_called_once_with()
+
+    @patch("time.time")
+    def test_send_queued_packets(self, time_mock):
+        time_mock.return_value = 1000
+        bot = self.create_bot()
+        for i in range(4):
+            bot.queue_packet(client_packets.PrivateMessage(i, "message", "\0"))
+        bot.queue_packet(client_packets.CharacterLookup("Tester"))
+
+        bot.transport.is_writable.return_value = False
+        self.assertFalse(bot.send_queued_packets())
+        bot.transport.write_frame.assert_not_called()
+
+        bot.transport.is_writable.return_value = True
+        self.assertTrue(bot.send_queued_packets())
+        self.assertEqual([30, 30, 30, 21], [call[0][0] for call in bot.transport.write_frame.call_args_list])
+        self.assertEqual(1, len(bot.packet_queue))
+
+        time_mock.return_value = 1001
+        self.assertTrue(bot.send_queued_packets())
+        self.assertEqual(0, len(bot.packet_queue))
+
+    @patch("time.time")
+    def test_want_write(self, time_mock):
+        time_mock.return_value = 1000
+        bot = self.create_bot()
+        bot.queue_packet(client_packets.CharacterLookup("Tester"))
+
+        bot.transport.is_writable.return_value = False
+        bot.iterate(1)
+        bot.transport.read_frame.assert_called_with(1, False)
+        self.assertTrue(bot.write_blocked)
+
+        # wait for the connection to become writable
+        bot.transport.is_writable.return_value = True
+        bot.iterate(1)
+        bot.transport.read_frame.assert_called_with(1, True)
+        self.assertFalse(bot.write_blocked)
+        bot.transport.write_frame.assert_called_once()
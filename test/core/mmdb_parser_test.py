@@ -0,0 +1,86 @@
+from core.aochat.mmdb_parser import MMDBParser
+import os
+import struct
+import tempfile
+import unittest
+
+
+class MMDBParserTest(unittest.TestCase):
+
+    def create_mmdb(self, categories):
+        # header, category table with a terminating entry, entry tables, then the strings
+        num_entries = sum(map(len, categories.values()))
+        offset = 8 + (len(categories) + 1) * 8
+        string_offset = offset + num_entries * 8
+
+        category_table = b""
+        entry_tables = b""
+        strings = b""
+        for category_id, instances in categories.items():
+            category_table += struct.pack("<II", category_id, offset + len(entry_tables))
+            for instance_id, message in instances.items():
+                entry_tables += struct.pack("<II", instance_id, string_offset + len(strings))
+                strings += message.encode("ISO-8859-1") + b"\x00"
+        category_table += struct.pack("<II", 0xFFFFFFFF, offset + len(entry_tables))
+
+        file, filename = tempfile.mkstemp()
+        with os.fdopen(file, "wb") as f:
+            f.write(b"MMDB" + struct.pack("<I", len(categories) + 1) + category_table + entry_tables + strings)
+        self.addCleanup(os.remove, filename)
+        return filename
+
+    def test_get_message_string(self):
+        mmdb = MMDBParser(self.create_mmdb({
+            506: {1: "%s attacked %s", 2: "The tower was destroyed"},
+            20000: {12345: "Système %s"}
+        }))
+        mmdb.start()
+        self.addCleanup(mmdb.stop)
+
+        self.assertEqual("%s attacked %s", mmdb.get_message_string(506, 1))
+        self.assertEqual("The tower was destroyed", mmdb.get_message_string(506, 2))
+        self.assertEqual("Système %s", mmdb.get_message_string(20000, 12345))
+        self.assertIsNone(mmdb.get_message_string(506, 12345))
+        self.assertIsNone(mmdb.get_message_string(507, 1))
+
+    def encode_base_85(self, n):
+        digits = ""
+        for _ in range(0, 5):
+            digits = chr(n % 85 + 33) + digits
+            n //= 85
+        return digits
+
+    def test_parse_params(self):
+        mmdb = MMDBParser(self.create_mmdb({
+            506: {1: "%s attacked %s (%d)", 2: "Neutral"},
+            20000: {7: "Omni"}
+        }))
+        self.addCleanup(mmdb.stop)
+
+        param_str = "s" + chr(7) + "Tester" + "R" + self.encode_base_85(506) + self.encode_base_85(2) + \
+            "i" + self.encode_base_85(123456) + "S" + chr(1) + chr(4) + "x" * 260 + "I\x00\x01\x00\x02" + "l\x00\x00\x00\x07 "
+        self.assertEqual(["Tester", "Neutral", 123456, "x" * 260, 65538, "Omni"], mmdb.parse_params(param_str))
+
+        # params are cached, but each caller gets its own list
+        params = mmdb.parse_params(param_str)
+        params.append("modified")
+        self.assertEqual(6, len(mmdb.parse_params(param_str)))
+
+        with self.assertRaises(Exception):
+            mmdb.parse_params("R" + self.encode_base_85(506) + self.encode_base_85(3))
+
+    def test_format_message(self):
+        mmdb = MMDBParser(self.create_mmdb({506: {1: "%s attacked %s (%d)", 2: "Neutral"}}))
+        self.addCleanup(mmdb.stop)
+
+        param_str = "s" + chr(5) + "Tank" + "s" + chr(5) + "Guru" + "u" + self.encode_base_85(220)
+        msg = self.encode_base_85(506) + self.encode_base_85(1) + param_str
+
+        self.assertEqual("Tank attacked Guru (220)", mmdb.format_message(506, 1, param_str))
+        self.assertEqual("Tank attacked Guru (220)", mmdb.format_message(506, 1, param_str))
+        self.assertEqual(1, mmdb.messages.get_stats()["hits"])
+
+        extended_message = mmdb.parse_extended_message(msg)
+        self.assertEqual((506, 1), (extended_message.category_id, extended_message.instance_id))
+        self.assertEqual(["Tank", "Guru", 220], extended_message.params)
+        self.assertEqual("Tank attacked Guru (220)", extended_message.get_message())
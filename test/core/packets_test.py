@@ -0,0 +1,62 @@
+from core.aochat import server_packets, client_packets
+from core.aochat.bot import Bot
+from core.aochat.packets import encode_args, decode_args, get_codec, PacketMissingArgument, UnknownArgumentType
+import unittest
+from unittest.mock import Mock
+
+
+class PacketsTest(unittest.TestCase):
+
+    def test_get_instance(self):
+        data = encode_args("IIS", [1234, 1, "\1"])
+        packet = server_packets.ServerPacket.get_instance(server_packets.BuddyAdded.id, data)
+        self.assertIsInstance(packet, server_packets.BuddyAdded)
+        self.assertEqual(packet.char_id, 1234)
+        self.assertEqual(packet.online, 1)
+
+        packet = client_packets.ClientPacket.get_instance(client_packets.BuddyAdd.id, encode_args("IS", [1234, "\1"]))
+        self.assertIsInstance(packet, client_packets.BuddyAdd)
+        self.assertEqual(packet.char_id, 1234)
+
+    def test_packet_types_are_separated(self):
+        self.assertIs(server_packets.ServerPacket.packet_types[30], server_packets.PrivateMessage)
+        self.assertIs(client_packets.ClientPacket.packet_types[30], client_packets.PrivateMessage)
+        self.assertNotIn(server_packets.ServerPacket, server_packets.ServerPacket.packet_types.values())
+
+    def test_unknown_packet(self):
+        count = server_packets.ServerPacket.unknown_packet_ids[9999]
+        self.assertIsNone(server_packets.ServerPacket.get_instance(9999, b""))
+        self.assertEqual(server_packets.ServerPacket.unknown_packet_ids[9999], count + 1)
+
+    def test_read_packet_skips_unknown_packet(self):
+        bot = Bot()
+        bot.transport = Mock()
+        bot.transport.read_frame.side_effect = [(9998, b""), (server_packets.LoginOK.id, b"")]
+        count = server_packets.ServerPacket.unknown_packet_ids[9998]
+
+        self.assertIsInstance(bot.read_packet(), server_packets.LoginOK)
+        self.assertEqual(server_packets.ServerPacket.unknown_packet_ids[9998], count + 1)
+        self.assertNotIn(9998, bot.dropped_packet_ids)
+
+    def test_codec_round_trip(self):
+        args = [(3 << 32) + 1234, 5, (1, 2, 3), ["one", "two"], "text", 4294967295]
+        data = encode_args("GIisSI", args)
+        self.assertEqual(decode_args("GIisSI", data), args)
+        self.assertEqual(decode_args("GIisSI", memoryview(bytes(data))), args)
+        self.assertEqual(len(args), 6)
+
+    def test_codec_missing_argument(self):
+        self.assertRaises(PacketMissingArgument, encode_args, "IS", [1])
+        self.assertRaises(UnknownArgumentType, get_codec, "X")
+
+    def test_lazy_decoding(self):
+        data = bytearray(encode_args("IISS", [1, 2, "message", "blob"]))
+        packet = server_packets.ServerPacket.get_instance(server_packets.PrivateChannelMessage.id, memoryview(data))
+        data[:] = bytes(len(data))
+
+        self.assertNotIn("message", packet.__dict__)
+        self.assertEqual(packet.message, "message")
+        self.assertIn("message", packet.__dict__)
+        self.assertNotIn("blob", packet.__dict__)
+        self.assertEqual(packet.args, [1, 2, "message", "blob"])
+        self.assertEqual(packet.to_bytes(), encode_args("IISS", [1, 2, "message", "blob"]))
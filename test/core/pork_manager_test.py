@@ -0,0 +1,230 @@
+from core.pork.pork_manager import PorkManager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import json
+import queue
+import threading
+import time
+import unittest
+from unittest.mock import Mock
+
+CHAR_INFO_JSON = [{
+    "NAME": "Tester", "CHAR_INSTANCE": 123, "FIRSTNAME": "", "LASTNAME": "", "LEVELX": 220, "BREED": "Solitus",
+    "CHAR_DIMENSION": 5, "SEX": "Female", "SIDE": "Omni", "PROF": "Doctor", "PROFNAME": "Surgeon",
+    "RANK_name": "Champion", "ALIENLEVEL": 30, "PVPRATING": 1300, "PVPTITLE": None, "HEADID": 40
+}, None]
+
+
+class PorkStubHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        self.server.paths.append(self.path)
+        self.server.release.wait(5)
+        if "/name/Tester/" in self.path:
+            body = json.dumps(CHAR_INFO_JSON).encode()
+        else:
+            body = b"<html>not found</html>"
+
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class Bot:
+    dimension = 5
+
+    def __init__(self):
+        self.calls = queue.Queue()
+
+    def call_soon_threadsafe(self, callback, *args):
+        self.calls.put((callback, args))
+
+    def run_next_call(self):
+        callback, args = self.calls.get(timeout=5)
+        callback(*args)
+
+
+class PorkManagerTest(unittest.TestCase):
+
+    def setUp(self):
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), PorkStubHandler)
+        self.server.paths = []
+        self.server.release = threading.Event()
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+
+        self.pork_manager = PorkManager()
+        self.pork_manager.base_url = "http://127.0.0.1:%d" % self.server.server_port
+        self.pork_manager.bot = Bot()
+        self.pork_manager.db = Mock()
+        self.pork_manager.db.find.return_value = None
+        self.pork_manager.character_manager = Mock()
+        self.pork_manager.character_manager.resolve_char_to_name.side_effect = lambda char: char
+        self.addCleanup(self.pork_manager.stop)
+
+    def test_get_character_info_async(self):
+        future1 = self.pork_manager.get_character_info_async("Tester")
+        future2 = self.pork_manager.get_character_info_async("Tester")
+        self.assertIs(future1, future2)
+
+        self.server.release.set()
+        self.pork_manager.bot.run_next_call()
+
+        char_info = future1.result(0)
+        self.assertEqual(123, char_info.char_id)
+        self.assertEqual("people.anarchy-online.com", char_info.source)
+        self.assertEqual(1, len(self.server.paths))
+        self.assertEqual("/character/bio/d/5/name/Tester/bio.xml?data_type=json", self.server.paths[0])
+        self.pork_manager.db.bulk_upsert.assert_called_once()
+        self.assertEqual({}, self.pork_manager.pending_requests)
+
+    def test_get_character_info_not_found(self):
+        self.server.release.set()
+        future = self.pork_manager.get_character_info_async("Unknown")
+        self.pork_manager.bot.run_next_call()
+        self.assertIsNone(future.result(0))
+
+        # characters that PORK does not know are not requested again
+        self.assertIsNone(self.pork_manager.get_character_info("Unknown"))
+        self.assertEqual(1, len(self.server.paths))
+        self.pork_manager.db.bulk_upsert.assert_not_called()
+
+    def test_get_character_info_async_by_id(self):
+        self.server.release.set()
+        self.pork_manager.character_manager.resolve_char_to_name.side_effect = {123: "Tester"}.get
+
+        future = self.pork_manager.get_character_info_async(123)
+        self.pork_manager.bot.run_next_call()
+        self.assertEqual(123, future.result(0).char_id)
+
+        # ids without a known name are not requested
+        self.assertIsNone(self.pork_manager.get_character_info_async(456).result(0))
+        self.assertEqual(1, len(self.server.paths))
+
+    def test_get_character_info_timeout(self):
+        self.pork_manager.TIMEOUT = 0.1
+        self.assertIsNone(self.pork_manager.get_character_info("Tester"))
+        self.server.release.set()
+
+        # a failed request is not a negative result
+        self.assertNotIn("Tester", self.pork_manager.unknown_characters)
+
+    def test_stale_while_revalidate(self):
+        self.server.release.set()
+        row = {"char_id": 123, "name": "Tester", "source": "people.anarchy-online.com",
+               "last_updated": int(time.time()) - 3600}
+        self.pork_manager.db.find.side_effect = lambda table, query: dict(row)
+
+        # fresh info is not refreshed
+        self.assertEqual("people.anarchy-online.com (cache)", self.pork_manager.get_character_info("Tester")["source"])
+        self.assertEqual([], self.server.paths)
+
+        # old info is returned right away, and refreshed in the background
+        self.pork_manager.max_age["people.anarchy-online.com"] = 60
+        future = self.pork_manager.get_character_info_async("Tester")
+        self.assertEqual("people.anarchy-online.com (cache)", future.result(0)["source"])
+        self.assertIn("Tester", self.pork_manager.pending_requests)
+
+        self.pork_manager.bot.run_next_call()
+        self.assertEqual(1, len(self.server.paths))
+        self.pork_manager.db.bulk_upsert.assert_called_once()
+
+    def test_refresh_name_from_database(self):
+        self.server.release.set()
+        self.pork_manager.character_manager.resolve_char_to_name.side_effect = lambda char: None
+        self.pork_manager.db.find.return_value = {"char_id": 123, "name": "Tester", "source": "stub",
+                                                  "last_updated": 0}
+
+        # placeholders are not refreshed with their made up name
+        self.pork_manager.get_character_info_async(123)
+        self.assertEqual({}, self.pork_manager.pending_requests)
+
+        # old info is refreshed by the name in the database, when the name of the char id is not cached
+        self.pork_manager.db.find.return_value = {"char_id": 123, "name": "Tester",
+                                                  "source": "people.anarchy-online.com", "last_updated": 0}
+        self.pork_manager.get_character_info_async(123)
+        self.pork_manager.bot.run_next_call()
+        self.assertEqual(["/character/bio/d/5/name/Tester/bio.xml?data_type=json"], self.server.paths)
+
+    def test_load_character_infos(self):
+        self.server.release.set()
+        names = {123: "Tester", 456: "Unknown", 789: None, 111: "Fresh"}
+        self.pork_manager.character_manager.resolve_char_to_name.side_effect = names.get
+        self.pork_manager.db.find_all.return_value = [
+            {"char_id": 111, "name": "Fresh", "source": "people.anarchy-online.com", "last_updated": int(time.time())}
+        ]
+
+        self.pork_manager.load_character_infos([123, 456, 789, 111, 123])
+
+        # only missing info is requested, and everything is saved at once
+        self.assertEqual(2, len(self.server.paths))
+        self.pork_manager.db.bulk_upsert.assert_called_once()
+        rows = sorted(self.pork_manager.db.bulk_upsert.call_args[0][2], key=lambda row: row["char_id"])
+        self.assertEqual([(123, "Tester", "people.anarchy-online.com"), (456, "Unknown:456", "stub"),
+                          (789, "Unknown:789", "stub")],
+                         [(row["char_id"], row["name"], row["source"]) for row in rows])
+        self.assertIn("Unknown", self.pork_manager.unknown_characters)
+        self.assertEqual({}, self.pork_manager.pending_requests)
+
+        # the callbacks of the requests that were resolved by the batch do nothing
+        self.pork_manager.bot.run_next_call()
+        self.pork_manager.bot.run_next_call()
+        self.pork_manager.db.bulk_upsert.assert_called_once()
+
+    def test_load_character_infos_stale(self):
+        self.pork_manager.db.find_all.return_value = [
+            {"char_id": 123, "name": "Tester", "source": "people.anarchy-online.com", "last_updated": 0}
+        ]
+        self.pork_manager.character_manager.resolve_char_to_name.side_effect = {123: "Tester"}.get
+
+        # old info is refreshed in the background, while the server has not answered yet
+        start = time.time()
+        self.pork_manager.load_character_infos([123])
+        self.assertLess(time.time() - start, 1)
+        self.assertIn("Tester", self.pork_manager.pending_requests)
+        self.pork_manager.db.bulk_upsert.assert_not_called()
+
+        self.server.release.set()
+        self.pork_manager.bot.run_next_call()
+        self.assertEqual(123, self.pork_manager.db.bulk_upsert.call_args[0][2][0]["char_id"])
+
+    def test_load_character_infos_shares_request(self):
+        self.pork_manager.character_manager.resolve_char_to_name.side_effect = {123: "Tester"}.get
+        self.pork_manager.db.find_all.return_value = []
+
+        future = self.pork_manager.get_character_info_async(123)
+        self.server.release.set()
+        self.pork_manager.load_character_infos([123])
+
+        self.assertEqual(1, len(self.server.paths))
+        self.assertEqual(123, future.result(0).char_id)
+        self.pork_manager.db.bulk_upsert.assert_called_once()
+
+    def test_load_character_infos_timeout(self):
+        self.pork_manager.BATCH_TIMEOUT = 0.1
+        self.pork_manager.character_manager.resolve_char_to_name.side_effect = {123: "Tester"}.get
+        self.pork_manager.db.find_all.return_value = []
+
+        # a placeholder is saved, and replaced when the request finishes
+        self.pork_manager.load_character_infos([123])
+        self.assertEqual("stub", self.pork_manager.db.bulk_upsert.call_args[0][2][0]["source"])
+
+        self.server.release.set()
+        self.pork_manager.bot.run_next_call()
+        self.assertEqual("people.anarchy-online.com", self.pork_manager.db.bulk_upsert.call_args[0][2][0]["source"])
+
+    def test_load_character_infos_without_waiting(self):
+        self.pork_manager.character_manager.resolve_char_to_name.side_effect = {123: "Tester"}.get
+        self.pork_manager.db.find_all.return_value = []
+
+        start = time.time()
+        self.pork_manager.load_character_infos([123], timeout=0)
+        self.assertLess(time.time() - start, 1)
+        self.assertEqual("stub", self.pork_manager.db.bulk_upsert.call_args[0][2][0]["source"])
+
+        self.server.release.set()
+        self.pork_manager.bot.run_next_call()
+        self.assertEqual("people.anarchy-online.com", self.pork_manager.db.bulk_upsert.call_args[0][2][0]["source"])
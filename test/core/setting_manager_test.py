@@ -0,0 +1,25 @@
+from core.setting_manager import SettingManager
+from tools.setting_types import NumberSettingType
+import unittest
+from unittest.mock import Mock
+
+
+class SettingManagerTest(unittest.TestCase):
+
+    def test_values_in_memory(self):
+        setting_manager = SettingManager()
+        setting_manager.db = Mock()
+        setting_manager.db.find.return_value = {"name": "max_page_length", "value": "6000"}
+
+        setting = NumberSettingType()
+        setting.setting_manager = setting_manager
+        setting_manager.register("max_page_length", 7500, "Maximum page length", setting, "test")
+        self.assertEqual(setting.get_value(), 6000)
+
+        version = setting_manager.version
+        setting.set_value("9000")
+        self.assertEqual(setting.get_value(), 9000)
+        self.assertGreater(setting_manager.version, version)
+
+        setting_manager.db.update.assert_called_with("settings", {"name": "max_page_length"}, {"value": "9000"})
+        self.assertEqual(setting_manager.db.find.call_count, 1)
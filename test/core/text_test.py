@@ -1,4 +1,5 @@
 from tools.text import Text
+import random
 import unittest
 from unittest.mock import Mock, MagicMock
 
@@ -12,9 +13,10 @@ class TestTest(unittest.TestCase):
         self.assertEqual(text.get_next_line(msg, {"symbol": "\n", "include": True})[0], 'hello this is a test\n')
         self.assertEqual(text.get_next_line(msg, {"symbol": " ", "include": False})[0], 'hello')
 
-    def test_paginate(self):
+    def create_text(self):
         setting = Mock()
         setting.get_value = MagicMock(return_value="test")
+        setting.get_font_color = MagicMock(return_value="<font color=#FFF>")
         setting_manager = Mock()
         setting_manager.get = MagicMock(return_value=setting)
 
@@ -25,8 +27,121 @@ class TestTest(unittest.TestCase):
         text = Text()
         text.setting_manager = setting_manager
         text.bot = bot
+        return text
+
+    def create_settings_text(self, colors):
+        def get_setting(name):
+            setting = Mock()
+            setting.get_font_color.side_effect = lambda: "<font color=%s>" % colors.get(name, "#FFF")
+            setting.get_value.return_value = "!"
+            return setting
+
+        text = self.create_text()
+        text.setting_manager.get = MagicMock(side_effect=get_setting)
+        text.setting_manager.version = 0
+        return text
+
+    def test_format_message(self):
+        colors = {"header_color": "#FFFF00", "header2_color": "#FCA712", "highlight_color": "#FFFFFF"}
+        text = self.create_settings_text(colors)
+
+        self.assertEqual("<font color=#FFFF00>one</font> <font color=#FCA712>two</font>",
+                         text.format_message("<header>one<end> <header2>two<end>"))
+        self.assertEqual("char_name in org_name, try !help", text.format_message("<myname> in <myorg>, try <symbol>help"))
+        # unknown tags are left as they are
+        self.assertEqual("<font color='#FF0000'>red</font>\n    <headers>",
+                         text.format_message("<red>red<end><br><tab><headers>"))
+        self.assertEqual("no tags", text.format_message("no tags"))
+
+        text.bot.org_name = None
+        self.assertEqual("Unknown Org", text.format_message("<myorg>"))
+
+    def test_format_message_settings_changed(self):
+        colors = {"highlight_color": "#FFFFFF"}
+        text = self.create_settings_text(colors)
+        self.assertEqual("<font color=#FFFFFF>", text.format_message("<highlight>"))
+
+        # the tag values are cached until the settings change
+        colors["highlight_color"] = "#000000"
+        self.assertEqual("<font color=#FFFFFF>", text.format_message("<highlight>"))
+
+        text.setting_manager.version += 1
+        self.assertEqual("<font color=#000000>", text.format_message("<highlight>"))
+
+    def legacy_paginate(self, text, label, msg, max_page_length, max_num_pages=None, footer=None):
+        # the previous implementation, which splits the rest of the message again for every line
+        separators = iter(text.separators)
+
+        msg = ("<header>" + label + "<end>\n\n" + msg.strip()).replace("\"", "\\\"")
+        msg = text.format_message(msg)
+
+        if footer:
+            footer = "\n\n" + text.format_message(footer.replace("\"", "\\\""))
+        else:
+            footer = ""
+
+        rest = msg
+        current_page = ""
+        pages = []
+        separator = next(separators)
+        while len(rest) > 0:
+            line, rest = text.get_next_line(rest, separator)
+            line_length = len(line)
+
+            if line_length > max_page_length:
+                try:
+                    separator = next(separators)
+                    rest = line + rest
+                    continue
+                except StopIteration:
+                    raise Exception("Could not paginate: page is too large")
+
+            if max_num_pages == len(pages) + 1:
+                if len(current_page) + line_length + len(footer) > max_page_length:
+                    break
+            else:
+                if len(current_page) + line_length > max_page_length:
+                    pages.append(current_page.strip())
+                    current_page = ""
+
+            current_page += line
+
+        current_page = current_page.strip()
+        if len(current_page) + len(footer) > max_page_length:
+            pages.append(current_page)
+            pages.append(footer.strip())
+        else:
+            pages.append(current_page + footer)
+
+        num_pages = len(pages)
+        return [text.format_page(label if num_pages == 1 else label + " (Page " + str(index) + " / " + str(num_pages) + ")",
+                                 page) for page, index in zip(pages, range(1, num_pages + 1))]
+
+    def test_paginate(self):
+        text = self.create_text()
 
         msg = "hello this is a test\nthis is another test as well\nand a third\ntest also\nwhich is\nshort"
         pages = text.paginate("label", msg, 115)
         self.assertEqual(len(pages), 2)
         self.assertTrue("text://short" in pages[1])
+
+    def test_paginate_same_pages_as_legacy(self):
+        text = self.create_text()
+        words = ["a", "word", "<highlight>name<end>", "\"quoted\"", "x" * 40, "y" * 150, "\n", "\n", "\n\n",
+                 "<pagebreak>", "<tab>"]
+        rand = random.Random(42)
+
+        for _ in range(300):
+            msg = " ".join(rand.choice(words) for _ in range(rand.randint(0, 120)))
+            max_page_length = rand.choice([60, 100, 200, 1000])
+            max_num_pages = rand.choice([None, 1, 2, 3])
+            footer = rand.choice([None, "footer", "<highlight>" + "f" * 30 + "<end>"])
+
+            try:
+                expected = self.legacy_paginate(text, "label", msg, max_page_length, max_num_pages, footer)
+            except Exception as e:
+                with self.assertRaisesRegex(Exception, str(e)):
+                    text.paginate("label", msg, max_page_length, max_num_pages, footer)
+                continue
+
+            self.assertEqual(expected, text.paginate("label", msg, max_page_length, max_num_pages, footer))
@@ -0,0 +1,113 @@
+from core.aochat.transport import FrameBuffer, SocketTransport, HEADER, MAX_FRAME_SIZE
+import socket
+import threading
+import time
+import unittest
+
+
+class FrameBufferTest(unittest.TestCase):
+
+    def setUp(self):
+        self.reader, self.writer = socket.socketpair()
+        self.addCleanup(self.reader.close)
+        self.addCleanup(self.writer.close)
+        self.frame_buffer = FrameBuffer()
+
+    def read_frame(self):
+        frame = self.frame_buffer.next_frame()
+        while frame is None:
+            self.frame_buffer.recv_from(self.reader)
+            frame = self.frame_buffer.next_frame()
+        return frame
+
+    def test_frames_in_one_recv(self):
+        self.writer.sendall(HEADER.pack(1, 3) + b"one" + HEADER.pack(2, 0) + HEADER.pack(3, 5) + b"three")
+        self.frame_buffer.recv_from(self.reader)
+
+        self.assertEqual((1, b"one"), self.frame_buffer.next_frame())
+        self.assertEqual((2, b""), self.frame_buffer.next_frame())
+        self.assertEqual((3, b"three"), self.frame_buffer.next_frame())
+        self.assertIsNone(self.frame_buffer.next_frame())
+
+    def test_frame_split_across_recvs(self):
+        data = HEADER.pack(7, 4) + b"data"
+
+        # a partial header, then a partial body
+        self.writer.sendall(data[:2])
+        self.frame_buffer.recv_from(self.reader)
+        self.assertIsNone(self.frame_buffer.next_frame())
+
+        self.writer.sendall(data[2:6])
+        self.frame_buffer.recv_from(self.reader)
+        self.assertIsNone(self.frame_buffer.next_frame())
+
+        self.writer.sendall(data[6:])
+        self.frame_buffer.recv_from(self.reader)
+        packet_type, frame_data = self.frame_buffer.next_frame()
+        self.assertEqual(7, packet_type)
+        self.assertIsInstance(frame_data, memoryview)
+        self.assertEqual(b"data", frame_data)
+
+    def test_compaction(self):
+        big_data = (bytes(range(256)) * 256)[:0xffff]
+        self.writer.sendall(HEADER.pack(1, 10) + bytes(10) + HEADER.pack(2, len(big_data)) + big_data +
+                            HEADER.pack(3, 5)[:2])
+
+        self.assertEqual((1, bytes(10)), self.read_frame())
+        self.assertTrue((2, big_data) == self.read_frame())
+        self.assertGreater(self.frame_buffer.start, len(self.frame_buffer.buffer) - MAX_FRAME_SIZE)
+
+        # the partial frame is moved to the front of the buffer when more data is received
+        self.writer.sendall(HEADER.pack(3, 5)[2:] + b"three")
+        self.assertEqual((3, b"three"), self.read_frame())
+        self.assertEqual(HEADER.size + 5, self.frame_buffer.start)
+
+    def test_empty_buffer_is_reset(self):
+        self.writer.sendall(HEADER.pack(1, 3) + b"one")
+        self.assertEqual((1, b"one"), self.read_frame())
+
+        self.writer.sendall(HEADER.pack(2, 3) + b"two")
+        self.assertEqual((2, b"two"), self.read_frame())
+        self.assertEqual(HEADER.size + 3, self.frame_buffer.end)
+
+    def test_eof(self):
+        self.writer.close()
+        self.assertRaises(EOFError, self.frame_buffer.recv_from, self.reader)
+
+
+class SocketTransportTest(unittest.TestCase):
+
+    def setUp(self):
+        server = socket.create_server(("127.0.0.1", 0))
+        self.addCleanup(server.close)
+
+        self.transport = SocketTransport()
+        self.transport.connect("127.0.0.1", server.getsockname()[1])
+        self.addCleanup(self.transport.disconnect)
+
+        self.server_socket, _ = server.accept()
+        self.addCleanup(self.server_socket.close)
+
+    def test_read_frame(self):
+        self.server_socket.sendall(HEADER.pack(1, 3) + b"one")
+        self.assertEqual((1, b"one"), self.transport.read_frame(1))
+        self.assertIsNone(self.transport.read_frame(0.01))
+
+    def test_wakeup(self):
+        threading.Timer(0.05, self.transport.wakeup).start()
+
+        start = time.time()
+        self.assertIsNone(self.transport.read_frame(5))
+        self.assertLess(time.time() - start, 1)
+
+        # the wakeup is cleared
+        self.assertIsNone(self.transport.read_frame(0.01))
+
+    def test_disconnect(self):
+        wakeup_reader, wakeup_writer = self.transport.wakeup_reader, self.transport.wakeup_writer
+        self.transport.disconnect()
+
+        self.assertEqual(-1, wakeup_reader.fileno())
+        self.assertEqual(-1, wakeup_writer.fileno())
+        # does nothing while not connected
+        self.transport.wakeup()
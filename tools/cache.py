@@ -0,0 +1,56 @@
+import collections
+import time
+
+
+class LRUCache:
+    """
+    Bounded cache that evicts the least recently used entry when it is full.
+
+    If `ttl` is set, entries expire that many seconds after they were stored.
+    """
+
+    def __init__(self, max_size, ttl=None):
+        self.max_size = max_size
+        self.ttl = ttl
+        # key -> (value, expires_at)
+        self.entries = collections.OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __contains__(self, key):
+        return self.get(key, self) is not self
+
+    def get(self, key, default=None):
+        entry = self.entries.get(key, None)
+        if entry is None or (entry[1] is not None and entry[1] <= time.time()):
+            if entry is not None:
+                del self.entries[key]
+            self.misses += 1
+            return default
+
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return entry[0]
+
+    def set(self, key, value):
+        self.entries[key] = (value, time.time() + self.ttl if self.ttl else None)
+        self.entries.move_to_end(key)
+        if len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+
+    def delete(self, key):
+        self.entries.pop(key, None)
+
+    def clear(self):
+        self.entries.clear()
+
+    def get_stats(self):
+        return {
+            "size": len(self.entries),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses
+        }
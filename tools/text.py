@@ -1,13 +1,50 @@
 from core.decorators import instance
 from core.setting_manager import SettingManager
+import re
 
 
 @instance()
 class Text:
     separators = [{"symbol": "<pagebreak>", "include": False}, {"symbol": "\n", "include": True}, {"symbol": " ", "include": True}]
 
+    # tags with a fixed value, the other tags depend on settings or on the bot
+    static_tags = {
+        "<black>": "<font color='#000000'>",
+        "<white>": "<font color='#FFFFFF'>",
+        "<yellow>": "<font color='#FFFF00'>",
+        "<blue>": "<font color='#8CB5FF'>",
+        "<green>": "<font color='#00DE42'>",
+        "<red>": "<font color='#FF0000'>",
+        "<orange>": "<font color='#FCA712'>",
+        "<grey>": "<font color='#C3C3C3'>",
+        "<cyan>": "<font color='#00FFFF'>",
+        "<violet>": "<font color='#8F00FF'>",
+        "<tab>": "    ",
+        "<end>": "</font>",
+        "<br>": "\n"
+    }
+
+    color_setting_tags = {
+        "<header>": "header_color",
+        "<header2>": "header2_color",
+        "<highlight>": "highlight_color",
+        "<notice>": "notice_color",
+        "<neutral>": "neutral_color",
+        "<omni>": "omni_color",
+        "<clan>": "clan_color",
+        "<unknown>": "unknown_color"
+    }
+
+    # matches any tag, splitting a message on it puts the tags at the odd indexes
+    tag_regex = re.compile("(<(?:%s)>)" % "|".join(
+        map(lambda tag: re.escape(tag[1:-1]),
+            sorted(list(static_tags) + list(color_setting_tags) + ["<myname>", "<myorg>", "<symbol>"],
+                   key=len, reverse=True))))
+
     def __init__(self):
-        pass
+        self.tag_values = None
+        # settings version and bot names that `tag_values` was built for
+        self.tag_values_key = None
 
     def inject(self, registry):
         self.setting_manager: SettingManager = registry.get_instance("setting_manager")
@@ -40,35 +77,52 @@ class Text:
 
         separator = next(separators)
 
-        rest = msg
-        current_page = ""
+        # msg[pos:] is the part of the message that has not been added to a page yet
+        pos = 0
+        current_page = []
+        current_page_length = 0
         pages = []
 
-        while len(rest) > 0:
-            line, rest = self.get_next_line(rest, separator)
+        while pos < len(msg):
+            symbol = separator["symbol"]
+            index = msg.find(symbol, pos)
+            if index == -1:
+                line = msg[pos:]
+                next_pos = len(msg)
+            else:
+                line = msg[pos:index]
+                next_pos = index + len(symbol)
+
+            if separator["include"]:
+                line += symbol
             line_length = len(line)
 
             # if separator is not sufficient, try the next one
             if line_length > max_page_length:
                 try:
                     separator = next(separators)
-                    rest = line + rest
+                    msg = line + msg[next_pos:]
+                    pos = 0
                     continue
                 except StopIteration:
                     # this is thrown when there are no more separators in the iterator
                     raise Exception("Could not paginate: page is too large")
 
+            pos = next_pos
+
             if max_num_pages == len(pages) + 1:
-                if len(current_page) + line_length + len(footer) > max_page_length:
+                if current_page_length + line_length + len(footer) > max_page_length:
                     break
             else:
-                if len(current_page) + line_length > max_page_length:
-                    pages.append(current_page.strip())
-                    current_page = ""
+                if current_page_length + line_length > max_page_length:
+                    pages.append("".join(current_page).strip())
+                    current_page = []
+                    current_page_length = 0
 
-            current_page += line
+            current_page.append(line)
+            current_page_length += line_length
 
-        current_page = current_page.strip()
+        current_page = "".join(current_page).strip()
         if len(current_page) + len(footer) > max_page_length:
             pages.append(current_page)
             pages.append(footer.strip())
@@ -104,31 +158,21 @@ class Text:
         return line, rest
 
     def format_message(self, msg):
-        return msg\
-            .replace("<header>", self.setting_manager.get("header_color").get_font_color()) \
-            .replace("<header2>", self.setting_manager.get("header2_color").get_font_color()) \
-            .replace("<highlight>", self.setting_manager.get("highlight_color").get_font_color()) \
-            .replace("<notice>", self.setting_manager.get("notice_color").get_font_color()) \
-            \
-            .replace("<black>", "<font color='#000000'>") \
-            .replace("<white>", "<font color='#FFFFFF'>") \
-            .replace("<yellow>", "<font color='#FFFF00'>") \
-            .replace("<blue>", "<font color='#8CB5FF'>") \
-            .replace("<green>", "<font color='#00DE42'>") \
-            .replace("<red>", "<font color='#FF0000'>") \
-            .replace("<orange>", "<font color='#FCA712'>") \
-            .replace("<grey>", "<font color='#C3C3C3'>") \
-            .replace("<cyan>", "<font color='#00FFFF'>") \
-            .replace("<violet>", "<font color='#8F00FF'>") \
-            \
-            .replace("<neutral>", self.setting_manager.get("neutral_color").get_font_color()) \
-            .replace("<omni>", self.setting_manager.get("omni_color").get_font_color()) \
-            .replace("<clan>", self.setting_manager.get("clan_color").get_font_color()) \
-            .replace("<unknown>", self.setting_manager.get("unknown_color").get_font_color()) \
-            \
-            .replace("<myname>", self.bot.char_name) \
-            .replace("<myorg>", self.bot.org_name if self.bot.org_name else "Unknown Org") \
-            .replace("<tab>", "    ") \
-            .replace("<end>", "</font>") \
-            .replace("<symbol>", self.setting_manager.get("symbol").get_value()) \
-            .replace("<br>", "\n")
+        tag_values = self.get_tag_values()
+        parts = self.tag_regex.split(msg)
+        parts[1::2] = map(tag_values.__getitem__, parts[1::2])
+        return "".join(parts)
+
+    def get_tag_values(self):
+        key = (self.setting_manager.version, self.bot.char_name, self.bot.org_name)
+        if key != self.tag_values_key:
+            tag_values = dict(self.static_tags)
+            for tag, setting_name in self.color_setting_tags.items():
+                tag_values[tag] = self.setting_manager.get(setting_name).get_font_color()
+            tag_values["<myname>"] = self.bot.char_name
+            tag_values["<myorg>"] = self.bot.org_name if self.bot.org_name else "Unknown Org"
+            tag_values["<symbol>"] = self.setting_manager.get("symbol").get_value()
+
+            self.tag_values = tag_values
+            self.tag_values_key = key
+        return self.tag_values